@@ -5,8 +5,9 @@ import logging
 import sys
 from importlib.metadata import version as pkg_version
 
-from .modules.cli import run_cleanup, run_main, run_report
+from .modules.cli import run_cleanup, run_ingest, run_main, run_reclassify, run_report, run_watch
 from .modules.config import load_config
+from .modules.mail_source import MAIL_SOURCE_FORMATS
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +30,55 @@ def parse_args(argv=None):
     # --- run ---
     sub_run = subparsers.add_parser("run", help="Fetch bounces, classify, and generate reports")
     sub_run.add_argument("--days", type=int, default=None, help="Override fetch days (default: value from config)")
+    sub_run.add_argument(
+        "--full-scan",
+        action="store_true",
+        help="Ignore the stored UID sync state and scan the whole fetch window",
+    )
+    sub_run.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of accounts processed in parallel (default: value from config)",
+    )
+    sub_run.add_argument(
+        "--interval",
+        type=int,
+        default=0,
+        metavar="SEC",
+        help="Repeat the run every SEC seconds, reusing IMAP sessions (default: run once)",
+    )
+
+    # --- watch ---
+    sub_watch = subparsers.add_parser("watch", help="Keep IMAP connections open and process new bounces as they arrive")
+    sub_watch.add_argument("--days", type=int, default=None, help="Override fetch days (default: value from config)")
+    sub_watch.add_argument(
+        "--idle-timeout",
+        type=int,
+        default=300,
+        metavar="SEC",
+        help="Seconds before IDLE is re-issued (default: 300)",
+    )
+    sub_watch.add_argument(
+        "--poll-interval",
+        type=int,
+        default=60,
+        metavar="SEC",
+        help="NOOP polling interval for servers without IDLE (default: 60)",
+    )
+
+    # --- ingest ---
+    sub_ingest = subparsers.add_parser("ingest", help="Process bounces from a local mbox file, Maildir tree or .eml files")
+    sub_ingest.add_argument("path", metavar="PATH", help="Mailbox file or directory to read")
+    sub_ingest.add_argument("--account", required=True, metavar="NAME", help="Configured account that receives the records")
+    sub_ingest.add_argument(
+        "--format",
+        choices=("auto",) + MAIL_SOURCE_FORMATS,
+        default="auto",
+        help="Mailbox format (default: auto)",
+    )
+    sub_ingest.add_argument("--days", type=int, default=None, help="Only process messages dated within DAYS days (default: all)")
 
     # --- cleanup ---
     sub_cleanup = subparsers.add_parser("cleanup", help="Delete reports and cache entries for a date")
@@ -55,6 +105,24 @@ def parse_args(argv=None):
         help="Show body content for each record",
     )
 
+    # --- reclassify ---
+    sub_reclassify = subparsers.add_parser("reclassify", help="Classify stored report records again and rewrite the reports")
+    sub_reclassify.add_argument("start", nargs="?", default="", metavar="START", help="First date of the range (default: today)")
+    sub_reclassify.add_argument("end", nargs="?", default="", metavar="END", help="Last date of the range (default: START)")
+    sub_reclassify.add_argument(
+        "--accounts",
+        default=None,
+        metavar="ACCTS",
+        help="Account names to include (comma-separated, default: all)",
+    )
+    sub_reclassify.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of classification requests sent in parallel (default: ollama.concurrency)",
+    )
+
     # --- version ---
     subparsers.add_parser("version", help="Show version")
 
@@ -76,21 +144,22 @@ def main():
 
     if args.command == "cleanup":
         run_cleanup(config, args.date)
-        return
-
-    if args.command == "report":
+    elif args.command == "report":
         run_report(config, args.date, args.category, args.accounts, args.detail)
-        return
-
-    if args.command == "version":
+    elif args.command == "reclassify":
+        run_reclassify(config, args.start, args.end, args.accounts, args.concurrency)
+    elif args.command == "version":
         print(pkg_version("imap-error-mail-analyzer"))
-        return
-
-    if args.command == "run":
+    elif args.command == "run":
+        days = args.days or config.default_days or _DEFAULT_DAYS
+        concurrency = args.concurrency or config.concurrency
+        logger.debug("Fetch window: %d day(s), account concurrency: %d", days, concurrency)
+        run_main(config, days, args.full_scan, concurrency, args.interval)
+    elif args.command == "ingest":
+        run_ingest(config, args.path, args.account, fmt=args.format, days=args.days)
+    elif args.command == "watch":
         days = args.days or config.default_days or _DEFAULT_DAYS
-        logger.debug("Fetch window: %d day(s)", days)
-        run_main(config, days)
-        return
+        run_watch(config, days, idle_timeout=args.idle_timeout, poll_interval=args.poll_interval)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+"""Content-addressed archive of raw bounce messages.
+
+Each bounce is stored once, compressed, under the hash returned by
+:func:`compute_message_hash` and sharded by its first two byte pairs
+(``ab/cd/abcd....eml.gz``).  ``index.jsonl`` in the archive root lists
+every stored message with its account and folder so the archive can be
+replayed with ``ingest --format archive``.
+"""
+
+import gzip
+import json
+import logging
+import threading
+from datetime import date
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, only needed for "zstd"
+    zstandard = None
+
+from .config import ARCHIVE_COMPRESSIONS
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.jsonl"
+
+_SUFFIXES = {"gzip": ".eml.gz", "zstd": ".eml.zst"}
+
+
+class RawArchive:
+    """Stores and loads raw RFC822 bytes keyed by message hash.
+
+    Parameters
+    ----------
+    archive_dir : str
+        Root directory of the archive.
+    compression : str
+        ``"gzip"`` or ``"zstd"`` (requires the ``zstandard`` package).
+        Only affects newly stored messages; both formats are read.
+    """
+
+    def __init__(self, archive_dir, compression="gzip"):
+        self.archive_dir = Path(archive_dir)
+        self.compression = compression
+        self._lock = threading.Lock()
+
+    def store(self, msg_hash, raw, *, account, folder):
+        """Store *raw* under *msg_hash* unless it is already archived.
+
+        Returns
+        -------
+        bool
+            True if the message was newly written.
+        """
+        with self._lock:
+            if self.find(msg_hash) is not None:
+                return False
+            path = self._path(msg_hash, self.compression)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp")
+            tmp_path.write_bytes(_compress(raw, self.compression))
+            tmp_path.replace(path)
+
+            entry = {
+                "hash": msg_hash,
+                "account": account,
+                "folder": folder,
+                "archived": date.today().isoformat(),
+                "size": len(raw),
+                "path": path.relative_to(self.archive_dir).as_posix(),
+            }
+            with open(self.archive_dir / INDEX_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        logger.debug("Archived %s (%d bytes) from '%s' folder '%s'", msg_hash, len(raw), account, folder)
+        return True
+
+    def find(self, msg_hash):
+        """Return the path of the archived message *msg_hash*, or None."""
+        for compression in ARCHIVE_COMPRESSIONS:
+            path = self._path(msg_hash, compression)
+            if path.exists():
+                return path
+        return None
+
+    def load(self, msg_hash):
+        """Return the raw bytes of *msg_hash*, or None if it is not archived."""
+        path = self.find(msg_hash)
+        if path is None:
+            return None
+        return _decompress(path.read_bytes(), _compression_of(path))
+
+    def iter_index(self):
+        """Yield the index entries in the order the messages were archived."""
+        index_path = self.archive_dir / INDEX_FILE
+        if not index_path.exists():
+            return
+        with open(index_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping corrupt line in %s", index_path)
+
+    def iter_raw(self):
+        """Yield the raw bytes of every indexed message that is still stored."""
+        for entry in self.iter_index():
+            path = self.archive_dir / entry["path"]
+            if not path.exists():
+                logger.warning("Archived message missing: %s", path)
+                continue
+            yield _decompress(path.read_bytes(), _compression_of(path))
+
+    def _path(self, msg_hash, compression):
+        return self.archive_dir / msg_hash[:2] / msg_hash[2:4] / f"{msg_hash}{_SUFFIXES[compression]}"
+
+
+# ------------------------------------------------------------------
+# Internal helpers
+# ------------------------------------------------------------------
+
+
+def _compression_of(path):
+    return "zstd" if path.name.endswith(_SUFFIXES["zstd"]) else "gzip"
+
+
+def _compress(data, compression):
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data)
+
+
+def _decompress(data, compression):
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading .zst archive entries requires the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
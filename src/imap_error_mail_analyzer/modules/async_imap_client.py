@@ -0,0 +1,450 @@
+"""asyncio IMAP client with the same fetch contract as :class:`~.imap_client.ImapClient`."""
+
+import asyncio
+import collections
+import imaplib
+import logging
+import re
+import ssl
+import zlib
+
+from ..utils.imap_utils import format_uid_set, merge_fetch_items, parse_fetch_response
+from .imap_client import _PREFETCH_ITEMS, _RE_NEW_MAIL, ImapClientBase, _assemble_partials, _parse_search
+
+logger = logging.getLogger(__name__)
+
+# Bytes requested from the stream per read
+_READ_CHUNK = 65536
+
+# Seconds to wait for the LOGOUT response before closing the socket
+_LOGOUT_TIMEOUT = 5
+
+_RE_LITERAL = re.compile(rb"\{(\d+)\}$")
+_RE_FETCH_HEAD = re.compile(rb"^\* (\d+) FETCH ", re.IGNORECASE)
+_RE_SEARCH = re.compile(rb"^\* SEARCH\b ?(.*)$", re.IGNORECASE)
+_RE_CAPABILITY = re.compile(rb"\bCAPABILITY ([^\]]+)", re.IGNORECASE)
+
+
+class AsyncImapClient(ImapClientBase):  # pylint: disable=too-many-instance-attributes
+    """IMAP client built on :mod:`asyncio` streams.
+
+    Provides the operations of :class:`~.imap_client.ImapClient` as
+    coroutines so that many sessions can share one event loop.  Commands
+    are tagged and may be pipelined: a reader task matches each tagged
+    completion to its command and attributes untagged responses to the
+    oldest command still in flight.  :meth:`fetch_messages` keeps up to
+    *pipeline_depth* batches in flight while the caller processes the
+    previous one, and stops requesting new batches while the caller is
+    busy.
+
+    Parameters
+    ----------
+    account : AccountConfig
+        Account to connect to.
+    sync_state : SyncState or None
+        UID sync state used when the account has ``incremental_sync`` enabled.
+    pipeline_depth : int
+        Number of ``UID FETCH`` batches requested ahead of the consumer.
+    """
+
+    def __init__(self, account, sync_state=None, *, pipeline_depth=2):
+        super().__init__(account, sync_state)
+        self.pipeline_depth = max(1, pipeline_depth)
+        self.capabilities = ()
+        self._reader = None
+        self._writer = None
+        self._buffer = bytearray()
+        self._inflater = None
+        self._compressor = None
+        self._compress_tag = None
+        self._pending = collections.deque()
+        self._unsolicited = []
+        self._activity = asyncio.Event()
+        self._continuation = None
+        self._dispatcher = None
+        self._error = None
+        self._tag_count = 0
+
+    # ------------------------------------------------------------------
+    # Connection
+    # ------------------------------------------------------------------
+
+    async def connect(self):
+        """Establish connection and authenticate."""
+        security = self.account.security.lower()
+        host = self.account.host
+        context = ssl.create_default_context() if security in ("ssl", "starttls") else None
+
+        if security == "ssl":
+            self._reader, self._writer = await asyncio.open_connection(host, self.account.port, ssl=context)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(host, self.account.port)
+        await self._read_response()
+
+        if security == "starttls":
+            if not hasattr(self._writer, "start_tls"):
+                raise RuntimeError("STARTTLS with the asyncio IMAP backend requires Python 3.11 or later")
+            await self._send(b"S0 STARTTLS\r\n")
+            while True:
+                response = await self._read_response()
+                head = _response_head(response)
+                if head.startswith(b"S0 "):
+                    break
+            if not head.startswith(b"S0 OK"):
+                raise imaplib.IMAP4.error(f"STARTTLS failed: {head.decode(errors='replace')}")
+            await self._writer.start_tls(context, server_hostname=host)
+
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        status, _, text = await self._command(f"LOGIN {_quote(self.account.username)} {_quote(self.account.password)}")
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"LOGIN failed: {text.decode(errors='replace')}")
+        logger.debug("Connected to %s as %s (asyncio)", host, self.account.username)
+
+        # Servers may advertise extensions only after authentication
+        _, untagged, _ = await self._command("CAPABILITY")
+        for response in untagged:
+            match = _RE_CAPABILITY.search(_response_head(response))
+            if match:
+                self.capabilities = tuple(match.group(1).decode("ascii", errors="replace").upper().split())
+
+        if self.account.compress and "COMPRESS=DEFLATE" in self.capabilities:
+            await self._enable_compress()
+        if self.sync_state is not None and "ENABLE" in self.capabilities and {"CONDSTORE", "QRESYNC"} & set(self.capabilities):
+            status, _, _ = await self._command("ENABLE CONDSTORE")
+            self._condstore = status == "OK"
+
+    async def disconnect(self):
+        """Log out and close the connection."""
+        self._condstore = False
+        if self._writer is None:
+            return
+        if self._error is None:
+            try:
+                await asyncio.wait_for(self._command("LOGOUT"), _LOGOUT_TIMEOUT)
+            except Exception:  # pylint: disable=broad-except
+                pass
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except Exception:  # pylint: disable=broad-except
+            pass
+        self._writer = None
+        self._reader = None
+        logger.debug("Disconnected from %s", self.account.host)
+
+    async def noop(self):
+        """Send NOOP to keep the session alive; raises if the connection is gone."""
+        await self._command("NOOP")
+
+    @property
+    def supports_idle(self):
+        """True if the server advertises the IDLE extension."""
+        return "IDLE" in self.capabilities
+
+    # ------------------------------------------------------------------
+    # Fetching
+    # ------------------------------------------------------------------
+
+    async def fetch_messages(self, folder, days, skip_hash=None):
+        """Yield all messages from *folder* that arrived within *days* days.
+
+        Asynchronous counterpart of :meth:`ImapClient.fetch_messages` with
+        the same search, prefilter, partial fetch and sync-state behaviour.
+
+        Yields
+        ------
+        email.message.Message
+            The sync state of the folder advances past a message once the
+            caller requests the next one.
+        """
+        status, untagged, _ = await self._command(f"EXAMINE {_quote(folder)}")
+        if status != "OK":
+            logger.warning("Failed to select folder: %s", folder)
+            return
+
+        uidvalidity = _response_code(untagged, b"UIDVALIDITY")
+        modseq = _response_code(untagged, b"HIGHESTMODSEQ") if self._condstore else None
+        window = self._scan_window(folder, days, uidvalidity, modseq)
+        if window is None:
+            return
+        criteria, last_uid, _ = window
+
+        uids = await self._search(folder, criteria, last_uid)
+        filtered = uids
+        if uids and self.account.search_criteria:
+            filtered = await self._search(folder, f"{criteria} {self.account.search_criteria}", last_uid)
+        targets = self._select_targets(folder, window, uids, filtered, (uidvalidity, modseq))
+        if targets is None:
+            return
+        uids, highest_uid = targets
+
+        batch_size = max(1, self.account.fetch_batch_size)
+        batches = collections.deque(uids[start : start + batch_size] for start in range(0, len(uids), batch_size))
+        in_flight = collections.deque()
+        downloaded = 0
+        skipped_bytes = 0
+        try:
+            while batches or in_flight:
+                while batches and len(in_flight) < self.pipeline_depth:
+                    in_flight.append(asyncio.ensure_future(self._fetch_batch(folder, batches.popleft(), skip_hash)))
+                fetched, batch_skipped = await in_flight.popleft()
+                skipped_bytes += batch_skipped
+                downloaded += len(fetched)
+                for msg in self._iter_batch(folder, uidvalidity, fetched):
+                    yield msg
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        self._finish_scan(folder, (uidvalidity, modseq), highest_uid, (downloaded, len(uids), skipped_bytes))
+
+    async def wait_for_changes(self, timeout):
+        """Wait until the selected folder reports new mail.
+
+        Uses IDLE when the server supports it and otherwise sleeps for
+        *timeout* seconds and polls with NOOP.
+
+        Returns
+        -------
+        bool
+            True if the server reported new messages.
+        """
+        if self.supports_idle:
+            return await self._idle(timeout)
+        self._unsolicited.clear()
+        await asyncio.sleep(timeout)
+        _, untagged, _ = await self._command("NOOP")
+        return _has_new_mail(untagged + self._unsolicited)
+
+    async def _search(self, folder, criteria, last_uid):
+        """Run ``UID SEARCH`` and return the matching UIDs above *last_uid*, or None on failure."""
+        status, untagged, _ = await self._command(f"UID SEARCH ({criteria})")
+        if status != "OK":
+            logger.warning("Failed to search folder %s with criteria: %s", folder, criteria)
+            return None
+        found = b" ".join(match.group(1) for match in (_RE_SEARCH.match(_response_head(response)) for response in untagged) if match)
+        return _parse_search(found, last_uid)
+
+    async def _fetch_batch(self, folder, uids, skip_hash):
+        """Download one batch; returns ``(uid, raw_bytes, partial)`` entries in UID order and the skipped size."""
+        if not self.account.prefilter and self.account.partial_fetch_bytes <= 0:
+            return await self._fetch_full(folder, uids), 0
+
+        prefetched, skipped_bytes = self._select_prefetched(await self._fetch_items(folder, uids, _PREFETCH_ITEMS), skip_hash)
+        full_uids, plans = self._plan_download(prefetched)
+
+        # Partial plans are independent commands, so they are pipelined
+        responses = await asyncio.gather(*(self._fetch_items(folder, list(structures), items) for items, structures in plans.items()))
+        results = []
+        for structures, items in zip(plans.values(), responses):
+            rebuilt, retry = _assemble_partials(structures, items)
+            results.extend(rebuilt)
+            full_uids.extend(retry)
+
+        results.extend(await self._fetch_full(folder, sorted(full_uids)))
+        return sorted(results, key=lambda result: result[0]), skipped_bytes
+
+    async def _fetch_full(self, folder, uids):
+        """Fetch *uids* with ``RFC822`` and return ``(uid, raw_bytes, False)`` entries."""
+        items = await self._fetch_items(folder, uids, "(RFC822)")
+        return [(item["uid"], item["items"]["RFC822"], False) for item in items if "RFC822" in item["items"]]
+
+    async def _fetch_items(self, folder, uids, items):
+        """Run one ``UID FETCH`` for *uids* and return the parsed per-message items in UID order."""
+        if not uids:
+            return []
+        status, untagged, _ = await self._command(f"UID FETCH {format_uid_set(uids)} {items}")
+        if status != "OK":
+            logger.warning("Failed to fetch %d message(s) from %s", len(uids), folder)
+            return []
+
+        # Rebuild the flat list imaplib returns so parse_fetch_response can be shared
+        data = []
+        for response in untagged:
+            first = response[0]
+            head = first[0] if isinstance(first, tuple) else first
+            if not _RE_FETCH_HEAD.match(head):
+                continue
+            head = _RE_FETCH_HEAD.sub(rb"\1 ", head, count=1)
+            data.append((head, first[1]) if isinstance(first, tuple) else head)
+            data.extend(response[1:])
+        return merge_fetch_items(parse_fetch_response(data), uids)
+
+    # ------------------------------------------------------------------
+    # Protocol
+    # ------------------------------------------------------------------
+
+    async def _command(self, command):
+        """Send a tagged command and wait for its completion.
+
+        Returns
+        -------
+        tuple[str, list, bytes]
+            Completion status (``OK``/``NO``), untagged responses received
+            while the command was the oldest in flight, and the completion text.
+        """
+        tag, future, _ = self._start_command()
+        await self._send(tag + b" " + command.encode("utf-8") + b"\r\n")
+        return await future
+
+    def _start_command(self):
+        """Register a new tag; returns ``(tag, future, untagged)``."""
+        if self._error is not None:
+            raise ConnectionError(f"IMAP connection to {self.account.host} is closed") from self._error
+        self._tag_count += 1
+        entry = (f"A{self._tag_count:05d}".encode("ascii"), asyncio.get_running_loop().create_future(), [])
+        self._pending.append(entry)
+        return entry
+
+    async def _send(self, data):
+        if self._compressor is not None:
+            data = self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self._writer.write(data)
+        await self._writer.drain()
+
+    async def _enable_compress(self):
+        """Negotiate RFC 4978 ``COMPRESS=DEFLATE``; the reader task switches to inflating after the OK."""
+        tag, future, _ = self._start_command()
+        self._compress_tag = tag
+        await self._send(tag + b" COMPRESS DEFLATE\r\n")
+        status, _, _ = await future
+        if status == "OK":
+            self._compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+            logger.debug("COMPRESS=DEFLATE enabled on %s", self.account.host)
+
+    async def _idle(self, timeout):
+        """Run one IDLE cycle; return True if EXISTS/RECENT arrived before *timeout*."""
+        tag, future, untagged = self._start_command()
+        self._continuation = asyncio.get_running_loop().create_future()
+        await self._send(tag + b" IDLE\r\n")
+        await asyncio.wait({self._continuation, future}, return_when=asyncio.FIRST_COMPLETED)
+        if future.done():
+            status, _, text = future.result()
+            raise imaplib.IMAP4.error(f"IDLE rejected ({status}): {text.decode(errors='replace')}")
+
+        changed = False
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            while True:
+                self._activity.clear()
+                changed = _has_new_mail(untagged)
+                remaining = deadline - loop.time()
+                # A lost connection or a server ending IDLE on its own also ends the wait
+                if changed or remaining <= 0 or self._error is not None or future.done():
+                    break
+                try:
+                    await asyncio.wait_for(self._activity.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._error is None and not future.done():
+                await self._send(b"DONE\r\n")
+        await future
+        return changed or _has_new_mail(untagged)
+
+    async def _dispatch(self):
+        """Read responses and hand them to the commands in flight."""
+        try:
+            while True:
+                response = await self._read_response()
+                head = _response_head(response)
+                if head.startswith(b"* "):
+                    (self._pending[0][2] if self._pending else self._unsolicited).append(response)
+                    self._activity.set()
+                    continue
+                if head.startswith(b"+"):
+                    if self._continuation is not None and not self._continuation.done():
+                        self._continuation.set_result(head)
+                    continue
+
+                tag, _, text = head.partition(b" ")
+                entry = next((pending for pending in self._pending if pending[0] == tag), None)
+                if entry is None:
+                    logger.debug("Ignoring response with unknown tag: %r", head[:80])
+                    continue
+                self._pending.remove(entry)
+                status = text.split(b" ", 1)[0].decode("ascii", errors="replace").upper()
+                if status == "BAD":
+                    if not entry[1].done():
+                        entry[1].set_exception(imaplib.IMAP4.error(f"command failed: {text.decode(errors='replace')}"))
+                    continue
+                if tag == self._compress_tag and status == "OK":
+                    # Everything after the tagged OK is deflate-compressed
+                    self._inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+                    self._buffer = bytearray(self._inflater.decompress(bytes(self._buffer)))
+                if not entry[1].done():
+                    entry[1].set_result((status, entry[2], text))
+                self._activity.set()
+        except (OSError, EOFError, zlib.error) as exc:
+            self._error = exc
+            while self._pending:
+                _, future, _ = self._pending.popleft()
+                if not future.done():
+                    future.set_exception(ConnectionError(f"IMAP connection to {self.account.host} lost: {exc}"))
+            self._activity.set()
+
+    async def _read_response(self):
+        """Read one response; literals are returned as ``(line, literal)`` tuples like imaplib."""
+        line = await self._readline()
+        entries = []
+        while True:
+            match = _RE_LITERAL.search(line)
+            if not match:
+                break
+            entries.append((line, await self._readexactly(int(match.group(1)))))
+            line = await self._readline()
+        entries.append(line)
+        return entries
+
+    async def _readline(self):
+        start = 0
+        while True:
+            index = self._buffer.find(b"\r\n", start)
+            if index >= 0:
+                line = bytes(self._buffer[:index])
+                del self._buffer[: index + 2]
+                return line
+            start = max(0, len(self._buffer) - 1)
+            await self._fill()
+
+    async def _readexactly(self, size):
+        while len(self._buffer) < size:
+            await self._fill()
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    async def _fill(self):
+        chunk = await self._reader.read(_READ_CHUNK)
+        if not chunk:
+            raise EOFError("connection closed by server")
+        self._buffer += self._inflater.decompress(chunk) if self._inflater is not None else chunk
+
+
+def _quote(text):
+    """Return *text* as an IMAP quoted string."""
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _response_head(response):
+    """Return the first line of a response read by :meth:`AsyncImapClient._read_response`."""
+    first = response[0]
+    return first[0] if isinstance(first, tuple) else first
+
+
+def _response_code(untagged, code):
+    """Return the numeric value of a ``[CODE n]`` response code among *untagged*, or None."""
+    pattern = re.compile(rb"\[" + code + rb" (\d+)\]", re.IGNORECASE)
+    for response in untagged:
+        match = pattern.search(_response_head(response))
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def _has_new_mail(untagged):
+    """Return True if *untagged* contains an EXISTS or RECENT response."""
+    return any(_RE_NEW_MAIL.match(_response_head(response)) for response in untagged)
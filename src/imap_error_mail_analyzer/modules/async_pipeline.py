@@ -0,0 +1,198 @@
+"""asyncio driver for ``run`` and ``watch`` when ``imap_backend`` is ``"asyncio"``.
+
+All accounts and folders share one event loop.  Only the blocking Ollama
+requests run on the classifier's worker pool (``ollama.concurrency``
+threads), so the number of threads does not grow with the number of
+watched mailboxes.
+"""
+
+import asyncio
+import logging
+
+from .async_imap_client import AsyncImapClient
+from .pipeline import FolderScan, finish_account, open_account_state, publish_folder_scan, save_account_state
+
+logger = logging.getLogger(__name__)
+
+# Parsed messages queued per classification worker and batch slot before fetching pauses
+_PENDING_PER_WORKER = 2
+
+# Reconnect backoff of watched folders: first delay and upper bound in seconds
+_BACKOFF_BASE = 2
+_BACKOFF_MAX = 300
+
+
+async def run_accounts(config, days, ollama, *, archive=None, full_scan=False, concurrency=1):
+    """Process all accounts once on the running event loop.
+
+    Parameters
+    ----------
+    config : AppConfig
+        Application configuration.
+    days : int
+        Number of days to fetch.
+    ollama : OllamaClient
+        Classifier used for every bounce.
+    archive : RawArchive or None
+        Archive that receives the raw bytes of new bounce messages.
+    full_scan : bool
+        Ignore the stored UID sync state and scan the whole date window.
+    concurrency : int
+        Maximum number of accounts processed at the same time.
+
+    Returns
+    -------
+    dict[str, dict[str, int]]
+        Non-empty per-account summaries in config order.
+    """
+    limit = asyncio.Semaphore(max(1, concurrency))
+
+    async def process(account_name, account_config):
+        async with limit:
+            return await _process_account(account_name, account_config, days, config.log_dir, ollama=ollama, archive=archive, full_scan=full_scan)
+
+    summaries = await asyncio.gather(*(process(name, account_config) for name, account_config in config.accounts.items()))
+    return {name: summary for name, summary in zip(config.accounts, summaries) if summary}
+
+
+async def watch_accounts(config, days, ollama, *, archive=None, idle_timeout=300, poll_interval=60):
+    """Watch every configured folder on the running event loop until cancelled.
+
+    Each folder keeps its own IMAP session, waits with IDLE (or NOOP
+    polling) and is rescanned whenever new mail is reported.
+    """
+    watchers = []
+    for account_name, account_config in config.accounts.items():
+        cache, sync_state = open_account_state(config.log_dir, account_name, days)
+        for folder in account_config.check:
+            watchers.append(
+                _watch_folder(
+                    config,
+                    account_config,
+                    folder,
+                    days=days,
+                    cache=cache,
+                    sync_state=sync_state,
+                    ollama=ollama,
+                    archive=archive,
+                    waits=(idle_timeout, poll_interval),
+                )
+            )
+    if not watchers:
+        logger.warning("No folders to watch.")
+        return
+    logger.info("Watching %d folder(s) on one event loop. Press Ctrl+C to stop.", len(watchers))
+    await asyncio.gather(*watchers)
+
+
+# ------------------------------------------------------------------
+# Internal helpers
+# ------------------------------------------------------------------
+
+
+async def _process_account(account_name, account_config, days, log_dir, *, ollama, archive, full_scan):
+    """Fetch, classify and report the bounces of one account; returns its summary."""
+    cache, sync_state = open_account_state(log_dir, account_name, days, full_scan=full_scan)
+    folder_queue = asyncio.Queue()
+    for folder in account_config.check:
+        folder_queue.put_nowait(folder)
+    num_connections = max(1, min(account_config.max_connections, len(account_config.check)))
+    results = {}
+
+    try:
+        connected = await asyncio.gather(
+            *(
+                _scan_folder_queue(account_config, folder_queue, results, days=days, cache=cache, sync_state=sync_state, ollama=ollama, archive=archive)
+                for _ in range(num_connections)
+            )
+        )
+    finally:
+        save_account_state(cache, sync_state)
+    return finish_account(account_name, account_config, results, log_dir) if any(connected) else {}
+
+
+async def _scan_folder_queue(account_config, folder_queue, results, *, days, cache, sync_state, ollama, archive):
+    """Open one session and scan folders from *folder_queue* until it is empty; False if the connection failed."""
+    client = AsyncImapClient(account_config, sync_state)
+    try:
+        await client.connect()
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.error("Failed to connect to account '%s'", account_config.name, exc_info=True)
+        await client.disconnect()
+        return False
+
+    try:
+        while not folder_queue.empty():
+            folder = folder_queue.get_nowait()
+            results[folder] = await _scan_folder(client, folder, account_config, days=days, cache=cache, ollama=ollama, archive=archive)
+    finally:
+        await client.disconnect()
+    return True
+
+
+async def _scan_folder(client, folder, account_config, *, days, cache, ollama, archive=None):
+    """Fetch, parse and classify the bounces of a single folder.
+
+    Bounces are classified on the worker pool of *ollama* while the
+    folder is still being fetched; the next message is only requested
+    while fewer than ``_PENDING_PER_WORKER`` messages per worker and batch
+    slot wait for their classification, so a slow classifier holds back the fetch pipeline.
+
+    Returns
+    -------
+    tuple[list[dict], list[dict], int]
+        Target records, excluded records and the number of bounce messages processed.
+    """
+    scan = FolderScan(folder, account_config, cache, archive, max_pending=_PENDING_PER_WORKER * ollama.concurrency * ollama.batch_size)
+    try:
+        async for msg in client.fetch_messages(folder, days, skip_hash=cache.is_processed):
+            msg_hash, bounces = scan.parse(msg)
+            if bounces:
+                scan.queue(msg_hash, bounces, [ollama.submit(bounce) for bounce in bounces])
+            await _drain(scan, scan.max_pending)
+        await _drain(scan)
+    finally:
+        scan.release()
+    return scan.result()
+
+
+async def _drain(scan, limit=0):
+    """Wait without blocking the event loop until at most *limit* queued messages of *scan* are unrecorded."""
+    scan.collect()
+    while scan.backlog > limit:
+        await asyncio.wait([asyncio.wrap_future(future) for future in scan.oldest_futures()])
+        scan.collect()
+
+
+async def _watch_folder(config, account_config, folder, *, days, cache, sync_state, ollama, archive, waits):
+    """Scan *folder* whenever the server reports new mail; reconnects with backoff after errors."""
+    idle_timeout, poll_interval = waits
+    failures = 0
+    announced = False
+
+    while True:
+        client = AsyncImapClient(account_config, sync_state)
+        delay = 0
+        try:
+            await client.connect()
+            if not announced:
+                logger.info("Watching '%s' folder '%s' (%s)", account_config.name, folder, "IDLE" if client.supports_idle else "NOOP polling")
+                announced = True
+            while True:
+                result = await _scan_folder(client, folder, account_config, days=days, cache=cache, ollama=ollama, archive=archive)
+                failures = 0
+                save_account_state(cache, sync_state)
+                publish_folder_scan(config, account_config, folder, result)
+                ollama.save_cache()
+                ollama.log_stats()
+
+                timeout = idle_timeout if client.supports_idle else poll_interval
+                while not await client.wait_for_changes(timeout):
+                    pass
+        except Exception:  # pylint: disable=broad-exception-caught
+            failures += 1
+            delay = min(_BACKOFF_BASE * 2 ** (failures - 1), _BACKOFF_MAX)
+            logger.error("Watch of '%s' folder '%s' failed; reconnecting in %ds", account_config.name, folder, delay, exc_info=True)
+        finally:
+            await client.disconnect()
+        await asyncio.sleep(delay)
@@ -1,7 +1,9 @@
-"""Processed-message cache to avoid reprocessing the same bounce."""
+"""File-backed caches: processed message hashes and IMAP sync state per account, and classifications."""
 
 import json
 import logging
+import threading
+import time
 from datetime import date, timedelta
 from pathlib import Path
 
@@ -13,12 +15,18 @@ class ProcessedCache:
 
     Each entry stores the date it was added so stale entries can be purged
     when they fall outside the configured fetch window.
+
+    Folder scans running in parallel :meth:`claim` a message before
+    classifying it, so a message found in two folders (e.g. Gmail labels)
+    is processed once; claims are not persisted.
     """
 
     def __init__(self, cache_dir, account_name):
         self._dir = Path(cache_dir)
         self._path = self._dir / f"{account_name}_processed.json"
         self._data = self._load()
+        self._claimed = set()
+        self._lock = threading.Lock()
 
     # ------------------------------------------------------------------
     # Public API
@@ -28,16 +36,32 @@ class ProcessedCache:
         """Return True if the message hash is already in the cache."""
         return msg_hash in self._data
 
+    def claim(self, msg_hash):
+        """Reserve *msg_hash* for processing; False if it is processed or claimed by another scan."""
+        with self._lock:
+            if msg_hash in self._data or msg_hash in self._claimed:
+                return False
+            self._claimed.add(msg_hash)
+            return True
+
+    def release(self, msg_hash):
+        """Drop the claim on *msg_hash* without marking it processed (the scan failed)."""
+        with self._lock:
+            self._claimed.discard(msg_hash)
+
     def mark_processed(self, msg_hash):
-        """Record *msg_hash* with today's date."""
-        self._data[msg_hash] = date.today().isoformat()
+        """Record *msg_hash* with today's date, replacing its claim."""
+        with self._lock:
+            self._data[msg_hash] = date.today().isoformat()
+            self._claimed.discard(msg_hash)
 
     def purge_older_than(self, days):
         """Remove entries added more than *days* days ago."""
         cutoff = date.today() - timedelta(days=days)
-        before = len(self._data)
-        self._data = {k: v for k, v in self._data.items() if date.fromisoformat(v) >= cutoff}
-        removed = before - len(self._data)
+        with self._lock:
+            before = len(self._data)
+            self._data = {k: v for k, v in self._data.items() if date.fromisoformat(v) >= cutoff}
+            removed = before - len(self._data)
         if removed:
             logger.debug("Purged %d stale cache entries", removed)
 
@@ -55,18 +79,21 @@ class ProcessedCache:
             Number of entries removed.
         """
         iso = target_date.isoformat()
-        before = len(self._data)
-        self._data = {k: v for k, v in self._data.items() if v != iso}
-        removed = before - len(self._data)
+        with self._lock:
+            before = len(self._data)
+            self._data = {k: v for k, v in self._data.items() if v != iso}
+            removed = before - len(self._data)
         if removed:
             logger.info("Removed %d cache entries for %s", removed, iso)
         return removed
 
     def save(self):
         """Persist the cache to disk."""
+        with self._lock:
+            data = dict(self._data)
         self._dir.mkdir(parents=True, exist_ok=True)
         with open(self._path, "w", encoding="utf-8") as f:
-            json.dump(self._data, f, ensure_ascii=False, indent=2)
+            json.dump(data, f, ensure_ascii=False, indent=2)
 
     # ------------------------------------------------------------------
     # Internal
@@ -81,3 +108,168 @@ class ProcessedCache:
         except (json.JSONDecodeError, OSError) as exc:
             logger.warning("Failed to load cache %s: %s", self._path, exc)
             return {}
+
+
+class SyncState:
+    """File-backed IMAP synchronisation state, scoped per account.
+
+    For each folder the ``UIDVALIDITY`` of the mailbox and the highest UID
+    fetched so far are stored so that later runs only request newer UIDs.
+    On CONDSTORE servers the ``HIGHESTMODSEQ`` of a completed scan is kept
+    as well, so an unchanged folder can be skipped without searching.
+    """
+
+    def __init__(self, cache_dir, account_name):
+        self._dir = Path(cache_dir)
+        self._path = self._dir / f"{account_name}_sync.json"
+        self._data = self._load()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get_last_uid(self, folder, uidvalidity):
+        """Return the highest fetched UID of *folder*, or 0 when unknown.
+
+        0 is also returned when *uidvalidity* differs from the stored value,
+        because UIDs from a previous mailbox generation are meaningless.
+        """
+        entry = self._data.get(folder)
+        if not entry:
+            return 0
+        if entry.get("uidvalidity") != uidvalidity:
+            logger.info("UIDVALIDITY of '%s' changed; falling back to the date window", folder)
+            return 0
+        return entry.get("last_uid", 0)
+
+    def get_modseq(self, folder, uidvalidity):
+        """Return the ``HIGHESTMODSEQ`` recorded after the last completed scan, or None."""
+        entry = self._data.get(folder)
+        if not entry or entry.get("uidvalidity") != uidvalidity:
+            return None
+        return entry.get("highestmodseq")
+
+    def update(self, folder, uidvalidity, last_uid, modseq=None):
+        """Record *last_uid* as the highest fetched UID of *folder*.
+
+        *modseq* should only be given once the folder has been scanned
+        completely; partial progress clears it.
+        """
+        entry = {"uidvalidity": uidvalidity, "last_uid": last_uid}
+        if modseq is not None:
+            entry["highestmodseq"] = modseq
+        with self._lock:
+            self._data[folder] = entry
+
+    def clear(self):
+        """Forget all folders so the next run scans the full date window."""
+        with self._lock:
+            self._data = {}
+
+    def save(self):
+        """Persist the sync state to disk."""
+        with self._lock:
+            data = dict(self._data)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        with open(self._path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    # ------------------------------------------------------------------
+    # Internal
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        if not self._path.exists():
+            return {}
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as exc:
+            logger.warning("Failed to load sync state %s: %s", self._path, exc)
+            return {}
+
+
+class ClassificationCache:
+    """File-backed cache of classifier results keyed by error signature.
+
+    Shared by all accounts.  Entries expire *ttl_days* after they were
+    stored, and when more than *max_entries* remain on :meth:`save` the
+    least recently used ones are dropped.  The whole cache is discarded
+    on load when *fingerprint* (model and prompt) differs from the one it
+    was written with.
+    """
+
+    def __init__(self, cache_dir, fingerprint, *, ttl_days=30, max_entries=10000):
+        self._dir = Path(cache_dir)
+        self._path = self._dir / "classifications.json"
+        self.fingerprint = fingerprint
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = self._load()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, signature):
+        """Return the cached ``{"responsible", "reason"}`` for *signature*, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(signature)
+            if entry is None or now - entry["stored"] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            entry["used"] = now
+            self.hits += 1
+            return {"responsible": entry["responsible"], "reason": entry["reason"]}
+
+    def put(self, signature, classification):
+        """Store the category and reason of *classification* under *signature*."""
+        now = time.time()
+        with self._lock:
+            self._data[signature] = {
+                "responsible": classification["responsible"],
+                "reason": classification["reason"],
+                "stored": now,
+                "used": now,
+            }
+
+    def save(self):
+        """Drop expired and surplus entries, then persist the cache to disk."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            entries = sorted(((k, v) for k, v in self._data.items() if v["stored"] >= cutoff), key=lambda item: item[1]["used"], reverse=True)
+            evicted = len(self._data) - min(len(entries), self.max_entries)
+            self._data = dict(entries[: self.max_entries])
+            data = {"fingerprint": self.fingerprint, "entries": dict(self._data)}
+            hits, misses = self.hits, self.misses
+        if evicted:
+            logger.debug("Evicted %d classification cache entries", evicted)
+        logger.debug("Classification cache: %d entries, %d hit(s), %d miss(es)", len(data["entries"]), hits, misses)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        with open(self._path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    # ------------------------------------------------------------------
+    # Internal
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        if not self._path.exists():
+            return {}
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as exc:
+            logger.warning("Failed to load classification cache %s: %s", self._path, exc)
+            return {}
+        entries = data.get("entries", {})
+        if data.get("fingerprint") != self.fingerprint:
+            if entries:
+                logger.info("Model or prompt changed; discarding %d cached classification(s)", len(entries))
+            return {}
+        return entries
@@ -1,54 +1,199 @@
 """CLI command implementations for IMAP Error Mail Analyzer."""
 
-import json
+import asyncio
 import logging
-import re
+import queue
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
 from pathlib import Path
 
-from .bounce_parser import extract_bounces
-from .cache import ProcessedCache
-from .imap_client import ImapClient
-from .ollama_client import OllamaClient
-from .html_report import generate_html_report
-from .report import write_reports
+from .archive import RawArchive
+from .async_pipeline import run_accounts, watch_accounts
+from .cache import ClassificationCache, ProcessedCache, SyncState
+from .config import AppConfig
+from .connection_manager import ConnectionManager
+from .ollama_client import OllamaClient, prompt_fingerprint
+from .ollama_endpoints import OllamaEndpoint
+from .rule_classifier import RuleClassifier
+from .report import bounce_from_record, list_report_accounts, parse_report_name, read_report_file, read_reports, reclassify_record, replace_reports
+from .pipeline import FolderScan, finish_account, open_account_state, publish_folder_scan, save_account_state
+from .html_report import write_html_report
+from .mail_source import LocalMailSource
 from ..utils.categories import VALID_CATEGORIES, TARGET_CATEGORIES
-from ..utils.date_utils import parse_date_or_today
-from ..utils.email_utils import compute_message_hash
+from ..utils.date_utils import parse_date, parse_date_or_today
 
 logger = logging.getLogger(__name__)
 
-_RE_REPORT_FILE = re.compile(r"^\d{8}_(.+)_(target|excluded)\.json$")
 
+# Watch mode: how long to wait for folder threads on shutdown
+_WATCH_STOP_TIMEOUT = 10
 
-def run_main(config, days):
+# Parsed messages queued per classification worker and batch slot before fetching pauses
+_PENDING_PER_WORKER = 2
+
+
+def run_main(config, days, full_scan=False, concurrency=1, interval=0):
     """Execute the main IMAP fetch-classify-report workflow for all accounts.
 
+    With *interval* the workflow is repeated until interrupted, reusing
+    the authenticated IMAP sessions of the previous pass.
+
     Parameters
     ----------
     config : AppConfig
         Application configuration.
     days : int
         Number of days to fetch.
+    full_scan : bool
+        Ignore the stored UID sync state and scan the whole date window.
+    concurrency : int
+        Maximum number of accounts processed in parallel.
+    interval : int
+        Seconds between passes; 0 runs a single pass.
     """
-    ollama = OllamaClient(config.ollama.base_url, config.ollama.model)
-    all_summaries = {}
-    for account_name, account_config in config.accounts.items():
-        logger.debug("--- Processing account: %s ---", account_name)
-        summary = _process_account(account_name, account_config, days, ollama, config.log_dir)
-        if summary:
-            all_summaries[account_name] = summary
+    ollama = _open_ollama(config)
+    archive = _open_archive(config)
+    connections = ConnectionManager()
+    try:
+        while True:
+            _run_pass(config, days, ollama, connections, archive=archive, full_scan=full_scan, concurrency=concurrency)
+            if not interval:
+                break
+            # Only the first pass ignores the sync state
+            full_scan = False
+            logger.info("Next run in %d second(s). Press Ctrl+C to stop.", interval)
+            try:
+                time.sleep(interval)
+            except KeyboardInterrupt:
+                logger.info("Stopped.")
+                break
+    finally:
+        connections.close()
+        ollama.close()
 
-    logger.debug("All accounts processed.")
-    _log_summary(all_summaries)
 
-    html_path = generate_html_report(config.log_dir, config.report_dir)
-    if html_path:
+def run_watch(config, days, *, idle_timeout=300, poll_interval=60):
+    """Watch every configured folder and process new bounces as they arrive.
+
+    One IMAP connection is kept open per account/folder.  Each connection
+    waits with IDLE (or NOOP polling when the server lacks IDLE) and runs a
+    UID-incremental scan whenever new mail is reported.  Runs until
+    interrupted with Ctrl+C.
+
+    Parameters
+    ----------
+    config : AppConfig
+        Application configuration.
+    days : int
+        Fetch window applied to each scan.
+    idle_timeout : float
+        Seconds before an IDLE command is re-issued.
+    poll_interval : float
+        Seconds between NOOP polls for servers without IDLE.
+    """
+    if config.imap_backend == "asyncio":
+        ollama = _open_ollama(config)
         try:
-            rel_path = Path(html_path).relative_to(Path.cwd())
-        except ValueError:
-            rel_path = html_path
-        logger.info("HTML report: %s", rel_path)
+            asyncio.run(watch_accounts(config, days, ollama, archive=_open_archive(config), idle_timeout=idle_timeout, poll_interval=poll_interval))
+        except KeyboardInterrupt:
+            logger.info("Stopped watch mode.")
+        finally:
+            ollama.close()
+            ollama.save_cache()
+        return
+
+    watch = _WatchContext(
+        config=config,
+        days=days,
+        ollama=_open_ollama(config),
+        connections=ConnectionManager(),
+        archive=_open_archive(config),
+        idle_timeout=idle_timeout,
+        poll_interval=poll_interval,
+    )
+    threads = []
+
+    for account_name, account_config in config.accounts.items():
+        cache, sync_state = open_account_state(config.log_dir, account_name, days)
+        # Folders of one account share the cache files
+        account_lock = threading.Lock()
+        for folder in account_config.check:
+            thread = threading.Thread(
+                target=_watch_folder,
+                args=(watch, account_config, folder),
+                kwargs={"cache": cache, "sync_state": sync_state, "account_lock": account_lock},
+                name=f"watch-{account_name}-{folder}",
+                daemon=True,
+            )
+            threads.append(thread)
+
+    if not threads:
+        logger.warning("No folders to watch.")
+        return
+
+    logger.info("Watching %d folder(s). Press Ctrl+C to stop.", len(threads))
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1.0)
+    except KeyboardInterrupt:
+        logger.info("Stopping watch mode...")
+        watch.stop_event.set()
+        for thread in threads:
+            thread.join(timeout=_WATCH_STOP_TIMEOUT)
+    finally:
+        watch.connections.close()
+        watch.ollama.close()
+
+
+def run_ingest(config, path, account_name, *, fmt="auto", days=None):
+    """Process the bounces stored in a local mbox file, Maildir tree or ``.eml`` files.
+
+    The messages go through the same extraction, classification and
+    reporting as ``run``; records are attributed to *account_name* and
+    their folder is set to *path*.
+
+    Parameters
+    ----------
+    config : AppConfig
+        Application configuration.
+    path : str
+        Mailbox file or directory to read.
+    account_name : str
+        Configured account whose cache and reports receive the results.
+    fmt : str
+        Mailbox format (``"mbox"``, ``"maildir"``, ``"eml"``) or ``"auto"``.
+    days : int or None
+        Only process messages dated within the last *days* days; None processes all.
+    """
+    account_config = config.accounts.get(account_name)
+    if account_config is None:
+        logger.error("Unknown account: %s", account_name)
+        logger.error("Configured accounts: %s", ", ".join(config.accounts))
+        sys.exit(1)
+    if not Path(path).exists():
+        logger.error("Mailbox not found: %s", path)
+        sys.exit(1)
+
+    ollama = _open_ollama(config)
+    cache = ProcessedCache(f"{config.log_dir}/cache", account_name)
+    try:
+        result = _scan_folder(LocalMailSource(fmt), path, account_config, days=days, ollama=ollama, cache=cache, archive=_open_archive(config))
+    finally:
+        ollama.close()
+        cache.save()
+        ollama.save_cache()
+
+    if not result[2]:
+        logger.info("No new bounce records found in '%s'.", path)
+    publish_folder_scan(config, account_config, path, result)
+    ollama.log_stats()
 
 
 def run_cleanup(config, date_text):
@@ -82,6 +227,10 @@ def run_cleanup(config, date_text):
         total_removed += removed
         if removed:
             cache.save()
+            # Removed messages must be fetched again on the next run
+            sync_state = SyncState(str(cache_dir), account_name)
+            sync_state.clear()
+            sync_state.save()
 
     if not total_removed:
         logger.info("No cache entries found for %s", target_date.isoformat())
@@ -121,6 +270,64 @@ def run_report(config, date_text, category_text, accounts_text=None, detail=Fals
         print(f"No matching records for {target_date.isoformat()} " f"(categories: {', '.join(sorted(categories))})")
 
 
+def run_reclassify(config, start_text, end_text="", accounts_text=None, concurrency=None):
+    """Classify the stored report records of a date range again and rewrite the reports.
+
+    Mail is neither fetched nor parsed: the bounce fields of each record
+    are sent to the classifier as they are, records with identical
+    classifier input are classified once, and each account's
+    target/excluded split is rewritten in place.  The HTML report of
+    every affected date is regenerated.
+
+    Parameters
+    ----------
+    config : AppConfig
+        Application configuration.
+    start_text : str
+        First date of the range (default: today).
+    end_text : str
+        Last date of the range (default: *start_text*).
+    accounts_text : str or None
+        Comma-separated account names to include (default: all).
+    concurrency : int or None
+        Number of classification requests sent in parallel (default: ``ollama.concurrency``).
+    """
+    try:
+        start_date = parse_date_or_today(start_text)
+        end_date = parse_date(end_text) if end_text else start_date
+    except ValueError as exc:
+        logger.error("%s", exc)
+        sys.exit(1)
+    if end_date < start_date:
+        logger.error("End date %s is before start date %s", end_date.isoformat(), start_date.isoformat())
+        sys.exit(1)
+
+    accounts = {a.strip() for a in accounts_text.split(",")} if accounts_text else None
+    ollama = _open_ollama(config, concurrency)
+    total_records = 0
+    total_changed = 0
+
+    try:
+        for offset in range((end_date - start_date).days + 1):
+            date_str = (start_date + timedelta(days=offset)).strftime("%Y%m%d")
+            account_names = [name for name in list_report_accounts(config.log_dir, date_str) if accounts is None or name in accounts]
+            for account_name in account_names:
+                records, changed = _reclassify_account(config.log_dir, date_str, account_name, ollama)
+                total_records += records
+                total_changed += changed
+            if account_names:
+                write_html_report(config.log_dir, config.report_dir, date_str)
+    finally:
+        ollama.close()
+    ollama.save_cache()
+    ollama.log_stats()
+
+    if not total_records:
+        logger.info("No report records found from %s to %s", start_date.isoformat(), end_date.isoformat())
+        return
+    logger.info("Reclassified %d record(s); %d changed category.", total_records, total_changed)
+
+
 def _resolve_categories(category_text):
     """Parse and validate the category filter string."""
     if not category_text:
@@ -136,21 +343,17 @@ def _resolve_categories(category_text):
 
 def _print_report_file(report_path, categories, accounts, detail):
     """Print filtered records from a single report file. Returns count of records shown."""
-    match = _RE_REPORT_FILE.match(report_path.name)
-    if not match:
+    parsed = parse_report_name(report_path.name)
+    if not parsed:
         return 0
 
-    account_name = match.group(1)
-    report_type = match.group(2)
+    account_name, report_type = parsed
 
     if accounts and account_name not in accounts:
         return 0
 
-    try:
-        with open(report_path, encoding="utf-8") as f:
-            records = json.load(f)
-    except (json.JSONDecodeError, OSError) as exc:
-        logger.warning("Failed to read %s: %s", report_path, exc)
+    records = read_report_file(report_path)
+    if not records:
         return 0
 
     filtered = [r for r in records if r.get("ai_responsible_party") in categories]
@@ -188,7 +391,126 @@ def _print_report_file(report_path, categories, accounts, detail):
 # ------------------------------------------------------------------
 
 
-def _process_account(account_name, account_config, days, ollama, log_dir):
+def _reclassify_account(log_dir, date_str, account_name, ollama):
+    """Reclassify the report records of one account and date; returns ``(records, changed)``.
+
+    The account and date are left untouched if a report file cannot be read.
+    """
+    reports = read_reports(log_dir, date_str, account_name)
+    if reports is None:
+        logger.error("Skipping account '%s' %s: report file could not be read", account_name, date_str)
+        return 0, 0
+    target_records, excluded_records = reports
+    records = target_records + excluded_records
+    if not records:
+        return 0, 0
+
+    # One request per distinct classifier input
+    futures = {}
+    keys = []
+    for record in records:
+        bounce = bounce_from_record(record)
+        key = (bounce.error_code, bounce.error_message, bounce.to_addr, bounce.body_plain, bounce.body_html)
+        if key not in futures:
+            futures[key] = ollama.submit(bounce)
+        keys.append(key)
+
+    new_target = []
+    new_excluded = []
+    changed = 0
+    for record, key in zip(records, keys):
+        classification = futures[key].result()
+        updated = reclassify_record(record, classification)
+        if updated["ai_responsible_party"] != record.get("ai_responsible_party"):
+            changed += 1
+        (new_excluded if classification["is_excluded"] else new_target).append(updated)
+
+    replace_reports(log_dir, date_str, account_name, new_target, new_excluded)
+    logger.info(
+        "Account '%s' %s: %d record(s) reclassified with %d request(s), %d changed, %d target, %d excluded",
+        account_name,
+        date_str,
+        len(records),
+        len(futures),
+        changed,
+        len(new_target),
+        len(new_excluded),
+    )
+    return len(records), changed
+
+
+def _open_ollama(config, concurrency=None):
+    """Return the classifier with the rule pre-classifier and persistent cache as configured.
+
+    *concurrency* overrides the size of its worker pool (``ollama.concurrency``).
+    """
+    cache = None
+    if config.ollama.cache_ttl_days > 0:
+        cache = ClassificationCache(
+            f"{config.log_dir}/cache",
+            prompt_fingerprint(config.ollama.model),
+            ttl_days=config.ollama.cache_ttl_days,
+            max_entries=config.ollama.cache_max_entries,
+        )
+    rules = RuleClassifier() if config.rule_classification else None
+    endpoints = [
+        OllamaEndpoint(endpoint.base_url, weight=endpoint.weight, max_concurrency=endpoint.max_concurrency) for endpoint in config.ollama.endpoints
+    ] or config.ollama.base_url
+    return OllamaClient(
+        endpoints,
+        config.ollama.model,
+        cache,
+        rules,
+        concurrency=concurrency or config.ollama.concurrency,
+        batch_size=config.ollama.batch_size,
+        keep_alive=config.ollama.keep_alive,
+        stream=config.ollama.stream,
+    )
+
+
+def _open_archive(config):
+    """Return the configured :class:`RawArchive`, or None when archiving is disabled."""
+    if not config.archive.directory:
+        return None
+    return RawArchive(config.archive.directory, config.archive.compression)
+
+
+def _run_pass(config, days, ollama, connections, *, archive, full_scan, concurrency):
+    """Process all accounts once, then log the summary and write the HTML report."""
+    if config.imap_backend == "asyncio":
+        all_summaries = asyncio.run(run_accounts(config, days, ollama, archive=archive, full_scan=full_scan, concurrency=concurrency))
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="account") as executor:
+            futures = {
+                account_name: executor.submit(
+                    _process_account,
+                    account_name,
+                    account_config,
+                    days,
+                    ollama,
+                    config.log_dir,
+                    connections=connections,
+                    archive=archive,
+                    full_scan=full_scan,
+                )
+                for account_name, account_config in config.accounts.items()
+            }
+
+        # Collect in config order so the summary matches sequential processing
+        all_summaries = {}
+        for account_name, future in futures.items():
+            summary = future.result()
+            if summary:
+                all_summaries[account_name] = summary
+
+    ollama.save_cache()
+    logger.debug("All accounts processed.")
+    _log_summary(all_summaries)
+    ollama.log_stats()
+    write_html_report(config.log_dir, config.report_dir)
+
+
+def _process_account(account_name, account_config, days, ollama, log_dir, *, connections, archive=None, full_scan=False):
     """Fetch bounces for a single IMAP account, classify, and write reports.
 
     Returns
@@ -196,90 +518,142 @@ def _process_account(account_name, account_config, days, ollama, log_dir):
     dict[str, int]
         Count of all bounce records grouped by ``ai_responsible_party``.
     """
-    cache = ProcessedCache(f"{log_dir}/cache", account_name)
-    cache.purge_older_than(days)
+    cache, sync_state = open_account_state(log_dir, account_name, days, full_scan=full_scan)
+
+    # Folders are shared out to up to max_connections workers, each with its own connection
+    folder_queue = queue.SimpleQueue()
+    for folder in account_config.check:
+        folder_queue.put(folder)
+    num_connections = max(1, min(account_config.max_connections, len(account_config.check)))
+    results = {}
 
-    client = ImapClient(account_config)
     try:
-        client.connect()
+        with ThreadPoolExecutor(max_workers=num_connections, thread_name_prefix=f"{account_name}-imap") as executor:
+            futures = [
+                executor.submit(
+                    _scan_folder_queue,
+                    account_config,
+                    folder_queue,
+                    results,
+                    days=days,
+                    ollama=ollama,
+                    cache=cache,
+                    sync_state=sync_state,
+                    connections=connections,
+                    archive=archive,
+                )
+                for _ in range(num_connections)
+            ]
+        connected = [future.result() for future in futures]
+    finally:
+        save_account_state(cache, sync_state)
+    return finish_account(account_name, account_config, results, log_dir) if any(connected) else {}
+
+
+def _scan_folder_queue(account_config, folder_queue, results, *, days, ollama, cache, sync_state, connections, archive):
+    """Borrow one IMAP session and scan folders from *folder_queue* until it is empty.
+
+    Per-folder results are stored in *results* keyed by folder name.
+
+    Returns
+    -------
+    bool
+        False if the connection could not be established.
+    """
+    try:
+        client = connections.acquire(account_config, sync_state)
     except Exception:  # pylint: disable=broad-exception-caught
-        logger.error("Failed to connect to account '%s'", account_name, exc_info=True)
-        return {}
+        logger.error("Failed to connect to account '%s'", account_config.name, exc_info=True)
+        return False
 
-    target_records = []
-    excluded_records = []
-    processed_count = 0
+    try:
+        while True:
+            try:
+                folder = folder_queue.get_nowait()
+            except queue.Empty:
+                break
+            results[folder] = _scan_folder(client, folder, account_config, days=days, ollama=ollama, cache=cache, archive=archive)
+    except BaseException:
+        connections.release(client, broken=True)
+        raise
+    connections.release(client)
+    return True
+
+
+def _scan_folder(client, folder, account_config, *, days, ollama, cache, archive=None):
+    """Fetch, parse and classify the bounces of a single folder.
+
+    Bounces are classified on the worker pool of *ollama* while fetching
+    and parsing continue; fetching pauses once ``_PENDING_PER_WORKER``
+    messages per worker and batch slot are waiting for their classification.
 
+    Returns
+    -------
+    tuple[list[dict], list[dict], int]
+        Target records, excluded records and the number of bounce messages processed.
+    """
+    scan = FolderScan(folder, account_config, cache, archive, max_pending=_PENDING_PER_WORKER * ollama.concurrency * ollama.batch_size)
     try:
-        for folder in account_config.check:
-            messages = client.fetch_messages(folder, days)
-            for msg in messages:
-                msg_hash = compute_message_hash(msg)
-                if cache.is_processed(msg_hash):
-                    continue
-
-                bounces = extract_bounces(msg, folder=folder, sender_address=account_config.username)
-                if not bounces:
-                    cache.mark_processed(msg_hash)
-                    continue
-
-                for bounce in bounces:
-                    classification = ollama.classify_error(bounce)
-                    label = "excluded" if classification["is_excluded"] else "target"
-                    logger.debug(
-                        "5xx [%s] %s -> %s",
-                        bounce.error_code,
-                        label,
-                        bounce.to_addr,
-                    )
-                    record = _build_record(bounce, classification)
-
-                    if classification["is_excluded"]:
-                        excluded_records.append(record)
-                    else:
-                        target_records.append(record)
-
-                cache.mark_processed(msg_hash)
-                processed_count += 1
+        for msg in client.fetch_messages(folder, days, skip_hash=cache.is_processed):
+            msg_hash, bounces = scan.parse(msg)
+            if bounces:
+                scan.queue(msg_hash, bounces, [ollama.submit(bounce) for bounce in bounces])
+            scan.drain(scan.max_pending)
+        scan.drain()
     finally:
-        client.disconnect()
-        cache.save()
+        scan.release()
+    return scan.result()
 
-    write_reports(log_dir, account_name, target_records, excluded_records)
 
-    logger.info(
-        "Account '%s': %d bounce(s) processed, %d target, %d excluded (user)",
-        account_name,
-        processed_count,
-        len(target_records),
-        len(excluded_records),
-    )
+@dataclass
+class _WatchContext:
+    """State shared by all folder threads of ``watch``."""
+
+    config: AppConfig
+    days: int
+    ollama: OllamaClient
+    connections: ConnectionManager
+    archive: RawArchive | None
+    idle_timeout: float
+    poll_interval: float
+    stop_event: threading.Event = field(default_factory=threading.Event)
+    report_lock: threading.Lock = field(default_factory=threading.Lock)
+
 
-    summary = {}
-    for rec in target_records + excluded_records:
-        party = rec["ai_responsible_party"]
-        summary[party] = summary.get(party, 0) + 1
-    return summary
-
-
-def _build_record(bounce, classification):
-    """Merge bounce data and AI classification into a flat dict for reporting."""
-    return {
-        "date": bounce.date,
-        "folder": bounce.folder,
-        "error_code": bounce.error_code,
-        "error_message": bounce.error_message,
-        "ai_responsible_party": classification["responsible"],
-        "ai_reason": classification["reason"],
-        "from_addr": bounce.from_addr,
-        "to_addr": bounce.to_addr,
-        "subject": bounce.subject,
-        "body_plain": bounce.body_plain,
-        "body_html": bounce.body_html,
-        "body_plain_original": bounce.body_plain_original,
-        "body_html_original": bounce.body_html_original,
-        "delivery_status": bounce.delivery_status,
-    }
+def _watch_folder(watch, account_config, folder, *, cache, sync_state, account_lock):
+    """Scan *folder*, then wait for new mail and scan again until the watch is stopped.
+
+    Each cycle borrows a session from the connection manager; after an
+    error the session is discarded and the next one is opened with backoff.
+    """
+    announced = False
+    while not watch.stop_event.is_set():
+        try:
+            with watch.connections.session(account_config, sync_state, watch.stop_event) as client:
+                if not announced:
+                    logger.info("Watching '%s' folder '%s' (%s)", account_config.name, folder, "IDLE" if client.supports_idle else "NOOP polling")
+                    announced = True
+                _watch_cycle(watch, client, account_config, folder, cache=cache, sync_state=sync_state, account_lock=account_lock)
+        except Exception:  # pylint: disable=broad-exception-caught
+            if not watch.stop_event.is_set():
+                logger.error("Watch of '%s' folder '%s' failed", account_config.name, folder, exc_info=True)
+
+
+def _watch_cycle(watch, client, account_config, folder, *, cache, sync_state, account_lock):
+    """Scan *folder* once, write the results and wait until the server reports new mail."""
+    result = _scan_folder(client, folder, account_config, days=watch.days, ollama=watch.ollama, cache=cache, archive=watch.archive)
+    with account_lock:
+        save_account_state(cache, sync_state)
+    # Report files are shared by the folders of an account and the HTML report by all accounts
+    with watch.report_lock:
+        publish_folder_scan(watch.config, account_config, folder, result)
+        watch.ollama.save_cache()
+        watch.ollama.log_stats()
+
+    timeout = watch.idle_timeout if client.supports_idle else watch.poll_interval
+    while not watch.stop_event.is_set():
+        if client.wait_for_changes(timeout, watch.stop_event):
+            break
 
 
 def _log_summary(all_summaries):
@@ -1,24 +1,53 @@
 """Configuration loading and validation."""
 
+import importlib.util
 import json
 import logging
+import re
 import sys
 from dataclasses import dataclass, field
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+IMAP_BACKENDS = ("imaplib", "asyncio")
+ARCHIVE_COMPRESSIONS = ("gzip", "zstd")
+
+
+@dataclass
+class OllamaEndpointConfig:
+    """One Ollama server of a load-balanced set."""
+
+    base_url: str
+    weight: float = 1
+    max_concurrency: int = 1
+
 
 @dataclass
-class OllamaConfig:
-    """Ollama API connection settings."""
+class OllamaConfig:  # pylint: disable=too-many-instance-attributes
+    """Ollama API connection settings; ``endpoints`` replaces ``base_url`` when set."""
 
     base_url: str = "http://localhost:11434"
     model: str = "gemma3:4b"
+    cache_ttl_days: int = 30
+    cache_max_entries: int = 10000
+    concurrency: int = 1
+    batch_size: int = 1
+    keep_alive: str | int = "30m"
+    stream: bool = False
+    endpoints: list[OllamaEndpointConfig] = field(default_factory=list)
 
 
 @dataclass
-class AccountConfig:
+class ArchiveConfig:
+    """Raw bounce archive settings; an empty ``directory`` disables the archive."""
+
+    directory: str = ""
+    compression: str = "gzip"
+
+
+@dataclass
+class AccountConfig:  # pylint: disable=too-many-instance-attributes
     """Single IMAP account connection settings."""
 
     name: str
@@ -28,6 +57,14 @@ class AccountConfig:
     password: str
     security: str = "ssl"
     check: list[str] = field(default_factory=lambda: ["INBOX"])
+    max_connections: int = 1
+    fetch_batch_size: int = 100
+    incremental_sync: bool = True
+    search_criteria: str = ""
+    prefilter: bool = True
+    bounce_sender_pattern: str = ""
+    partial_fetch_bytes: int = 0
+    compress: bool = True
 
 
 @dataclass
@@ -35,9 +72,13 @@ class AppConfig:
     """Application configuration."""
 
     default_days: int | None
+    concurrency: int
+    imap_backend: str
+    rule_classification: bool
     log_dir: str
     report_dir: str
     ollama: OllamaConfig
+    archive: ArchiveConfig
     accounts: dict[str, AccountConfig]
 
 
@@ -57,10 +98,21 @@ def load_config(config_path):
         raw = json.load(f)
 
     ollama_raw = raw.get("ollama", {})
+    endpoints = _load_ollama_endpoints(ollama_raw.get("endpoints", []))
     ollama = OllamaConfig(
         base_url=ollama_raw.get("base_url", "http://localhost:11434"),
         model=ollama_raw.get("model", "gemma3:4b"),
+        cache_ttl_days=ollama_raw.get("cache_ttl_days", 30),
+        cache_max_entries=ollama_raw.get("cache_max_entries", 10000),
+        # Enough workers to use every endpoint fully unless set explicitly
+        concurrency=ollama_raw.get("concurrency", sum(endpoint.max_concurrency for endpoint in endpoints) or 1),
+        batch_size=ollama_raw.get("batch_size", 1),
+        keep_alive=ollama_raw.get("keep_alive", "30m"),
+        stream=ollama_raw.get("stream", False),
+        endpoints=endpoints,
     )
+    for key in ("concurrency", "batch_size"):
+        _check_int(f"ollama.{key}", getattr(ollama, key))
 
     accounts = {}
     required_fields = ("host", "port", "username", "password")
@@ -69,6 +121,11 @@ def load_config(config_path):
             if key not in acc_raw:
                 logger.error("Account '%s' missing required field: %s", name, key)
                 sys.exit(1)
+        try:
+            re.compile(acc_raw.get("bounce_sender_pattern", ""))
+        except re.error as exc:
+            logger.error("Account '%s' has an invalid bounce_sender_pattern: %s", name, exc)
+            sys.exit(1)
         accounts[name] = AccountConfig(
             name=name,
             host=acc_raw["host"],
@@ -77,19 +134,86 @@ def load_config(config_path):
             password=acc_raw["password"],
             security=acc_raw.get("security", "ssl"),
             check=acc_raw.get("check", ["INBOX"]),
+            max_connections=acc_raw.get("max_connections", 1),
+            fetch_batch_size=acc_raw.get("fetch_batch_size", 100),
+            incremental_sync=acc_raw.get("incremental_sync", True),
+            search_criteria=acc_raw.get("search_criteria", "").strip(),
+            prefilter=acc_raw.get("prefilter", True),
+            bounce_sender_pattern=acc_raw.get("bounce_sender_pattern", ""),
+            partial_fetch_bytes=acc_raw.get("partial_fetch_bytes", 0),
+            compress=acc_raw.get("compress", True),
         )
+        for key in ("max_connections", "fetch_batch_size"):
+            _check_int(f"accounts.{name}.{key}", getattr(accounts[name], key))
+        _check_int(f"accounts.{name}.partial_fetch_bytes", accounts[name].partial_fetch_bytes, minimum=0)
 
     if not accounts:
         logger.error("No accounts configured")
         sys.exit(1)
 
+    imap_backend = raw.get("imap_backend", "imaplib")
+    if imap_backend not in IMAP_BACKENDS:
+        logger.error("Invalid imap_backend '%s' (expected one of: %s)", imap_backend, ", ".join(IMAP_BACKENDS))
+        sys.exit(1)
+
+    archive_raw = raw.get("archive", {})
+    archive = ArchiveConfig(
+        directory=str(config_dir / archive_raw["dir"]) if archive_raw.get("dir") else "",
+        compression=archive_raw.get("compression", "gzip"),
+    )
+    if archive.compression not in ARCHIVE_COMPRESSIONS:
+        logger.error("Invalid archive.compression '%s' (expected one of: %s)", archive.compression, ", ".join(ARCHIVE_COMPRESSIONS))
+        sys.exit(1)
+    if archive.compression == "zstd" and importlib.util.find_spec("zstandard") is None:
+        logger.error("archive.compression 'zstd' requires the 'zstandard' package (pip install zstandard)")
+        sys.exit(1)
+
+    concurrency = raw.get("concurrency", 1)
+    _check_int("concurrency", concurrency)
+
     log_dir = config_dir / raw.get("log_dir", "logs")
     report_dir = config_dir / raw.get("report_dir", "reports")
 
     return AppConfig(
         default_days=raw.get("default_days"),
+        concurrency=concurrency,
+        imap_backend=imap_backend,
+        rule_classification=raw.get("rule_classification", True),
         log_dir=str(log_dir),
         report_dir=str(report_dir),
         ollama=ollama,
+        archive=archive,
         accounts=accounts,
     )
+
+
+# ------------------------------------------------------------------
+# Internal helpers
+# ------------------------------------------------------------------
+
+
+def _load_ollama_endpoints(endpoints_raw):
+    """Return the validated ``ollama.endpoints`` entries; exits on invalid ones."""
+    endpoints = []
+    for index, endpoint_raw in enumerate(endpoints_raw):
+        if not endpoint_raw.get("base_url"):
+            logger.error("ollama.endpoints[%d] missing required field: base_url", index)
+            sys.exit(1)
+        endpoint = OllamaEndpointConfig(
+            base_url=endpoint_raw["base_url"],
+            weight=endpoint_raw.get("weight", 1),
+            max_concurrency=endpoint_raw.get("max_concurrency", 1),
+        )
+        if isinstance(endpoint.weight, bool) or not isinstance(endpoint.weight, (int, float)) or endpoint.weight <= 0:
+            logger.error("ollama.endpoints[%d].weight must be a positive number: %r", index, endpoint.weight)
+            sys.exit(1)
+        _check_int(f"ollama.endpoints[{index}].max_concurrency", endpoint.max_concurrency)
+        endpoints.append(endpoint)
+    return endpoints
+
+
+def _check_int(key, value, minimum=1):
+    """Exit unless *value* is an integer (not a bool) of at least *minimum* (1 or 0)."""
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        logger.error("%s must be a %s integer: %r", key, "positive" if minimum else "non-negative", value)
+        sys.exit(1)
@@ -0,0 +1,181 @@
+"""Reusable authenticated IMAP sessions, pooled per account."""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from .imap_client import ImapClient
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """Hands out authenticated :class:`ImapClient` sessions and keeps idle ones alive.
+
+    Released sessions are kept per account and reused by the next
+    :meth:`acquire`, so TLS handshake and LOGIN are paid once per session
+    rather than once per folder scan or run.  A background thread sends
+    NOOP to sessions that have been idle for *heartbeat_interval* seconds
+    and drops the ones that no longer answer.  Failed connection attempts
+    are retried with exponential backoff tracked per account.
+
+    Parameters
+    ----------
+    heartbeat_interval : float
+        Idle seconds after which a pooled session is checked with NOOP.
+    connect_attempts : int
+        Connection attempts made by one :meth:`acquire` call before giving up.
+    backoff_base : float
+        Delay in seconds after the first failure; doubled on each further failure.
+    backoff_max : float
+        Upper bound of the backoff delay in seconds.
+    """
+
+    def __init__(self, *, heartbeat_interval=300, connect_attempts=3, backoff_base=2, backoff_max=300):
+        self.heartbeat_interval = heartbeat_interval
+        self.connect_attempts = connect_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._idle = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="imap-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def acquire(self, account_config, sync_state=None, stop_event=None):
+        """Return a connected session for *account_config*, reusing an idle one if possible.
+
+        Parameters
+        ----------
+        account_config : AccountConfig
+            Account to connect to.
+        sync_state : SyncState or None
+            Sync state attached to the returned session.
+        stop_event : threading.Event or None
+            Interrupts the backoff wait; the last error is raised when set.
+
+        Raises
+        ------
+        Exception
+            The error of the last connection attempt if none succeeded.
+        """
+        client = self._take_idle(account_config.name)
+        if client is not None:
+            client.sync_state = sync_state if account_config.incremental_sync else None
+            return client
+
+        error = None
+        for _ in range(max(1, self.connect_attempts)):
+            delay = self._backoff_delay(account_config.name)
+            if delay:
+                logger.info("Reconnecting to account '%s' in %gs", account_config.name, delay)
+                if stop_event is None:
+                    time.sleep(delay)
+                elif stop_event.wait(delay):
+                    break
+            client = ImapClient(account_config, sync_state)
+            try:
+                client.connect()
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                client.disconnect()
+                error = exc
+                self._record_failure(account_config.name)
+                logger.warning("Connection to account '%s' failed: %s", account_config.name, exc)
+                continue
+            with self._lock:
+                self._failures.pop(account_config.name, None)
+            return client
+        raise error or RuntimeError(f"Connection to account '{account_config.name}' was cancelled")
+
+    def release(self, client, *, broken=False):
+        """Return *client* to the pool, or disconnect it if *broken* or the manager is closed."""
+        if broken or self._closed.is_set():
+            client.disconnect()
+            if broken:
+                self._record_failure(client.account.name)
+            return
+        with self._lock:
+            self._failures.pop(client.account.name, None)
+            self._idle.setdefault(client.account.name, []).append((client, time.monotonic()))
+
+    @contextmanager
+    def session(self, account_config, sync_state=None, stop_event=None):
+        """Context manager around :meth:`acquire`/:meth:`release`; errors mark the session broken."""
+        client = self.acquire(account_config, sync_state, stop_event)
+        try:
+            yield client
+        except BaseException:
+            self.release(client, broken=True)
+            raise
+        self.release(client)
+
+    def close(self):
+        """Stop the heartbeat and disconnect all pooled sessions."""
+        self._closed.set()
+        with self._lock:
+            pooled = [client for entries in self._idle.values() for client, _ in entries]
+            self._idle = {}
+        for client in pooled:
+            client.disconnect()
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _take_idle(self, account_name):
+        """Pop the most recently released session of *account_name* that still answers NOOP, or None."""
+        while True:
+            with self._lock:
+                entries = self._idle.get(account_name)
+                if not entries:
+                    return None
+                client, _ = entries.pop()
+            try:
+                client.noop()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.debug("Dropping dead IMAP session for account '%s'", account_name, exc_info=True)
+                client.disconnect()
+                continue
+            logger.debug("Reusing IMAP session for account '%s'", account_name)
+            return client
+
+    def _backoff_delay(self, account_name):
+        """Return the seconds to wait before the next connection attempt for *account_name*."""
+        with self._lock:
+            failures = self._failures.get(account_name, 0)
+        if not failures:
+            return 0
+        return min(self.backoff_base * 2 ** (failures - 1), self.backoff_max)
+
+    def _record_failure(self, account_name):
+        with self._lock:
+            self._failures[account_name] = self._failures.get(account_name, 0) + 1
+
+    def _heartbeat_loop(self):
+        """Send NOOP to sessions idle for longer than the heartbeat interval."""
+        while not self._closed.wait(min(self.heartbeat_interval, 60)):
+            now = time.monotonic()
+            due = []
+            with self._lock:
+                for account_name, entries in self._idle.items():
+                    keep = [(client, since) for client, since in entries if now - since < self.heartbeat_interval]
+                    due.extend(client for client, since in entries if now - since >= self.heartbeat_interval)
+                    self._idle[account_name] = keep
+            for client in due:
+                try:
+                    client.noop()
+                except Exception:  # pylint: disable=broad-exception-caught
+                    logger.debug("Dropping dead IMAP session for account '%s'", client.account.name, exc_info=True)
+                    client.disconnect()
+                    continue
+                with self._lock:
+                    if not self._closed.is_set():
+                        self._idle.setdefault(client.account.name, []).append((client, time.monotonic()))
+                        continue
+                client.disconnect()
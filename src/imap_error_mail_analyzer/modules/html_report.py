@@ -1,15 +1,14 @@
 """Generate Bootstrap 5 HTML bounce reports from JSON data."""
 
-import json
 import logging
-import re
 from datetime import datetime
 from html import escape
 from pathlib import Path
 
+from .report import parse_report_name, read_report_file
+
 logger = logging.getLogger(__name__)
 
-_RE_REPORT_FILE = re.compile(r"^\d{8}_(.+)_(target|excluded)\.json$")
 
 _CSS = """\
 .bounce-table th, .bounce-table td { vertical-align: top; }
@@ -62,6 +61,18 @@ def generate_html_report(log_dir, report_dir, date_str=None):
     return str(out_path)
 
 
+def write_html_report(log_dir, report_dir, date_str=None):
+    """Generate the HTML report of *date_str* (default: today) and log its path relative to the current directory."""
+    html_path = generate_html_report(log_dir, report_dir, date_str)
+    if html_path:
+        try:
+            rel_path = Path(html_path).relative_to(Path.cwd())
+        except ValueError:
+            rel_path = html_path
+        logger.info("HTML report: %s", rel_path)
+    return html_path
+
+
 def _collect_report_data(log_dir, date_str):
     """Read JSON files and group records by account and type.
 
@@ -72,16 +83,12 @@ def _collect_report_data(log_dir, date_str):
     """
     accounts = {}
     for path in sorted(log_dir.glob(f"{date_str}_*_*.json")):
-        match = _RE_REPORT_FILE.match(path.name)
-        if not match:
+        parsed = parse_report_name(path.name)
+        if not parsed:
             continue
-        account_name = match.group(1)
-        report_type = match.group(2)
-        try:
-            with open(path, encoding="utf-8") as f:
-                records = json.load(f)
-        except (json.JSONDecodeError, OSError) as exc:
-            logger.warning("Failed to read %s: %s", path, exc)
+        account_name, report_type = parsed
+        records = read_report_file(path)
+        if records is None:
             continue
         if account_name not in accounts:
             accounts[account_name] = {"target": [], "excluded": []}
@@ -2,17 +2,206 @@
 
 import email
 import imaplib
+import io
 import logging
+import re
+import select
+import ssl
+import time
+import zlib
 from datetime import datetime, timedelta
 
+from ..utils.email_utils import compute_message_hash, get_header, message_from_raw
+from ..utils.imap_utils import (
+    assemble_partial_message,
+    format_uid_set,
+    merge_fetch_items,
+    parse_bodystructure,
+    parse_fetch_response,
+    plan_partial_fetch,
+)
+
 logger = logging.getLogger(__name__)
 
+# Phase-one FETCH items used to decide whether and how a message is downloaded
+_PREFETCH_ITEMS = "(UID RFC822.SIZE BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (MESSAGE-ID CONTENT-TYPE FROM)])"
+
+# Read size for the compressed stream when COMPRESS=DEFLATE is active
+_COMPRESS_CHUNK = 65536
+
+# IDLE waits in short slices so that a stop request is noticed promptly
+_IDLE_SLICE_SECONDS = 1.0
+
+_RE_NEW_MAIL = re.compile(rb"^\* \d+ (?:EXISTS|RECENT)\b", re.IGNORECASE)
+_RE_SIZE = re.compile(rb"RFC822\.SIZE (\d+)", re.IGNORECASE)
+_RE_DSN_STRUCTURE = re.compile(rb'"MESSAGE"\s+"DELIVERY-STATUS"', re.IGNORECASE)
+_RE_DSN_REPORT_TYPE = re.compile(r"report-type\s*=\s*\"?delivery-status", re.IGNORECASE)
 
-class ImapClient:
-    """Connects to an IMAP server and fetches email messages."""
 
-    def __init__(self, account):
+class ImapClientBase:  # pylint: disable=too-few-public-methods
+    """Protocol-independent part of the IMAP clients.
+
+    Holds the account settings and the sync state, and decides what to
+    search for and what to download; subclasses perform the I/O.  When a
+    :class:`~.cache.SyncState` is given and the account has
+    ``incremental_sync`` enabled, only UIDs above the last fetched UID of
+    each folder are requested.
+    """
+
+    def __init__(self, account, sync_state=None):
         self.account = account
+        self.sync_state = sync_state if account.incremental_sync else None
+        self._sender_pattern = re.compile(account.bounce_sender_pattern, re.IGNORECASE) if account.bounce_sender_pattern else None
+        self._condstore = False
+
+    def _scan_window(self, folder, days, uidvalidity, modseq):
+        """Build the ``UID SEARCH`` criteria for *folder*.
+
+        Returns
+        -------
+        tuple[str, int, str] or None
+            Criteria, last synced UID and the ``SINCE`` date, or None if the
+            folder is unchanged since the last completed scan.
+        """
+        since = datetime.now() - timedelta(days=days)
+        date_str = since.strftime("%d-%b-%Y")
+        last_uid = 0
+        criteria = f'SINCE "{date_str}"'
+        if self.sync_state is not None and uidvalidity is not None:
+            if modseq is not None and modseq == self.sync_state.get_modseq(folder, uidvalidity):
+                logger.debug("No changes in %s since the last sync (HIGHESTMODSEQ %d)", folder, modseq)
+                return None
+            last_uid = self.sync_state.get_last_uid(folder, uidvalidity)
+            if last_uid:
+                criteria = f"UID {last_uid + 1}:* {criteria}"
+        return criteria, last_uid, date_str
+
+    def _select_prefetched(self, items, skip_hash):
+        """Return the phase-one FETCH items worth downloading and the size of the others.
+
+        With ``prefilter`` enabled only messages that contain a
+        ``message/delivery-status`` part or whose From header matches the
+        account's ``bounce_sender_pattern`` are kept, and messages whose
+        hash is reported as already processed by *skip_hash* are dropped.
+
+        Returns
+        -------
+        tuple[list[dict], int]
+            Kept FETCH items (see :func:`parse_fetch_response`) and the
+            total size in bytes of the skipped messages.
+        """
+        kept = []
+        skipped_bytes = 0
+        for item in items:
+            header = email.message_from_bytes(_find_item(item, "BODY[HEADER.FIELDS") or b"")
+            keep = True
+            if self.account.prefilter:
+                keep = _has_delivery_status(item["text"], header)
+                if not keep and self._sender_pattern:
+                    keep = bool(self._sender_pattern.search(get_header(header, "From")))
+                if keep and skip_hash and get_header(header, "Message-ID").strip():
+                    keep = not skip_hash(compute_message_hash(header))
+
+            if keep:
+                kept.append(item)
+            else:
+                skipped_bytes += _message_size(item)
+        return kept, skipped_bytes
+
+    def _plan_download(self, prefetched):
+        """Split prefetched items into full downloads and partial-fetch plans.
+
+        When ``partial_fetch_bytes`` is set, messages larger than that
+        limit are planned for a partial fetch (see
+        :func:`plan_partial_fetch`); all others are fetched in full.
+
+        Returns
+        -------
+        tuple[list[int], dict[str, dict[int, dict]]]
+            UIDs to fetch with ``RFC822``, and the parsed BODYSTRUCTURE of
+            each partially fetched UID grouped by FETCH item list.
+        """
+        max_bytes = self.account.partial_fetch_bytes
+        full_uids = []
+        plans = {}
+        for item in prefetched:
+            structure = parse_bodystructure(item["text"]) if 0 < max_bytes < _message_size(item) else None
+            if structure is None:
+                full_uids.append(item["uid"])
+                continue
+            items = f"({' '.join(plan_partial_fetch(structure, max_bytes))})"
+            plans.setdefault(items, {})[item["uid"]] = structure
+        return full_uids, plans
+
+    def _select_targets(self, folder, window, uids, filtered, sync_point):
+        """Pick the UIDs to download from the search results of *folder*.
+
+        Parameters
+        ----------
+        window : tuple[str, int, str]
+            Result of :meth:`_scan_window`.
+        uids, filtered : list[int] or None
+            UIDs matched by the date/UID search and by the search narrowed
+            with ``search_criteria`` (the same list when no criteria are set).
+        sync_point : tuple[int, int]
+            UIDVALIDITY and HIGHESTMODSEQ of the folder.
+
+        Returns
+        -------
+        tuple[list[int], int] or None
+            UIDs to download and the highest UID seen, or None if there is
+            nothing to download.
+        """
+        _, last_uid, date_str = window
+        if uids is None or filtered is None:
+            return None
+        highest_uid = max(uids, default=last_uid)
+        if filtered is not uids:
+            logger.info(
+                "Server-side filter in %s: %d of %d message(s) matched, %d dropped",
+                folder,
+                len(filtered),
+                len(uids),
+                len(uids) - len(filtered),
+            )
+
+        if not filtered:
+            logger.debug("No new messages in %s since %s", folder, date_str)
+            self._mark_synced(folder, sync_point[0], highest_uid, sync_point[1])
+            return None
+
+        logger.debug("Found %d message(s) in %s since %s (after UID %d)", len(filtered), folder, date_str, last_uid)
+        return filtered, highest_uid
+
+    def _iter_batch(self, folder, uidvalidity, fetched):
+        """Yield the messages of a downloaded batch, advancing the sync state once each is consumed."""
+        # Pop messages one by one so each raw message can be released after use
+        fetched.reverse()
+        while fetched:
+            uid, raw, partial = fetched.pop()
+            yield message_from_raw(raw, partial=partial)
+            self._mark_synced(folder, uidvalidity, uid)
+
+    def _finish_scan(self, folder, sync_point, highest_uid, counts):
+        """Record a completed scan of *folder* and log the prefilter statistics.
+
+        *counts* holds the downloaded, matched and skipped-bytes totals.
+        """
+        self._mark_synced(folder, sync_point[0], highest_uid, sync_point[1])
+        if self.account.prefilter:
+            logger.debug("Prefilter: %d of %d message(s) in %s downloaded (%d bytes skipped)", counts[0], counts[1], folder, counts[2])
+
+    def _mark_synced(self, folder, uidvalidity, uid, modseq=None):
+        """Advance the sync state of *folder* to *uid* (and *modseq* once the scan is complete)."""
+        if self.sync_state is not None and uidvalidity is not None:
+            self.sync_state.update(folder, uidvalidity, uid, modseq)
+
+
+class ImapClient(ImapClientBase):
+    """Connects to an IMAP server with :mod:`imaplib` and fetches email messages."""
+
+    def __init__(self, account, sync_state=None):
+        super().__init__(account, sync_state)
         self._conn = None
 
     def connect(self):
@@ -31,10 +220,42 @@ class ImapClient:
         self._conn.login(self.account.username, self.account.password)
         logger.debug("Connected to %s as %s", host, self.account.username)
 
-    def fetch_messages(self, folder, days):
-        """Fetch all messages from *folder* that arrived within *days* days.
+        # Servers may advertise extensions only after authentication
+        _, data = self._conn.capability()
+        self._conn.capabilities = tuple((data[-1] or b"").decode("ascii", errors="replace").upper().split())
+
+        if self.account.compress:
+            self._enable_compress()
+        if self.sync_state is not None:
+            self._enable_condstore()
 
-        Returns a list of ``email.message.Message`` objects.
+    def fetch_messages(self, folder, days, skip_hash=None):
+        """Yield all messages from *folder* that arrived within *days* days.
+
+        Messages are requested with ``UID FETCH`` in batches of
+        ``fetch_batch_size`` UIDs per command to avoid one round-trip per
+        message, and yielded as each batch arrives so that memory use is
+        bounded by the batch size rather than the folder size.  With
+        incremental sync only UIDs newer than the last run are searched;
+        the date window still applies.  With ``prefilter`` enabled only
+        bounce candidates are downloaded in full.
+
+        Parameters
+        ----------
+        folder : str
+            Mailbox folder to fetch from.
+        days : int
+            Number of days to fetch.
+        skip_hash : callable or None
+            Predicate on :func:`compute_message_hash` values; messages for
+            which it returns True are not downloaded.  Only consulted by the
+            prefilter, for messages that carry a Message-ID.
+
+        Yields
+        ------
+        email.message.Message
+            The sync state of the folder advances past a message once the
+            caller requests the next one.
         """
         if not self._conn:
             raise RuntimeError("Not connected. Call connect() first.")
@@ -42,30 +263,267 @@ class ImapClient:
         status, _ = self._conn.select(folder, readonly=True)
         if status != "OK":
             logger.warning("Failed to select folder: %s", folder)
-            return []
+            return
 
-        since = datetime.now() - timedelta(days=days)
-        date_str = since.strftime("%d-%b-%Y")
+        uidvalidity = self._get_response_number("UIDVALIDITY")
+        modseq = self._get_response_number("HIGHESTMODSEQ") if self._condstore else None
+        window = self._scan_window(folder, days, uidvalidity, modseq)
+        if window is None:
+            return
+        criteria, last_uid, _ = window
+
+        uids = self._search(folder, criteria, last_uid)
+        filtered = uids
+        if uids and self.account.search_criteria:
+            filtered = self._search(folder, f"{criteria} {self.account.search_criteria}", last_uid)
+        targets = self._select_targets(folder, window, uids, filtered, (uidvalidity, modseq))
+        if targets is None:
+            return
+        uids, highest_uid = targets
 
-        status, data = self._conn.search(None, f'(SINCE "{date_str}")')
-        if status != "OK" or not data[0]:
-            logger.debug("No messages in %s since %s", folder, date_str)
+        downloaded = 0
+        skipped_bytes = 0
+        batch_size = max(1, self.account.fetch_batch_size)
+        for start in range(0, len(uids), batch_size):
+            chunk = uids[start : start + batch_size]
+            prefetched = None
+            if self.account.prefilter or self.account.partial_fetch_bytes > 0:
+                prefetched, chunk_skipped = self._prefetch(folder, chunk, skip_hash)
+                skipped_bytes += chunk_skipped
+
+            fetched = self._download(folder, chunk, prefetched)
+            downloaded += len(fetched)
+            yield from self._iter_batch(folder, uidvalidity, fetched)
+
+        self._finish_scan(folder, (uidvalidity, modseq), highest_uid, (downloaded, len(uids), skipped_bytes))
+
+    def _search(self, folder, criteria, last_uid):
+        """Run ``UID SEARCH`` and return the matching UIDs above *last_uid* in ascending order.
+
+        Returns None if the search fails.
+        """
+        status, data = self._conn.uid("SEARCH", None, f"({criteria})")
+        if status != "OK":
+            logger.warning("Failed to search folder %s with criteria: %s", folder, criteria)
+            return None
+        return _parse_search(data[0], last_uid)
+
+    def _prefetch(self, folder, uids, skip_hash):
+        """Fetch the structure of *uids* and return the phase-one items worth downloading.
+
+        Fetches ``BODYSTRUCTURE``, ``RFC822.SIZE`` and a few headers for
+        every UID and filters them with :meth:`_select_prefetched`.
+        """
+        return self._select_prefetched(self._fetch_items(folder, uids, _PREFETCH_ITEMS), skip_hash)
+
+    def _download(self, folder, uids, prefetched):
+        """Download the messages of a batch.
+
+        Without *prefetched* items every UID is fetched with ``RFC822``.
+        Otherwise only the prefetched messages are downloaded; when
+        ``partial_fetch_bytes`` is set, messages larger than that limit are
+        rebuilt from the MIME sections the parser needs (see
+        :func:`plan_partial_fetch`) and the rest are fetched in full.
+
+        Returns
+        -------
+        list[tuple[int, bytes, bool]]
+            ``(uid, raw_bytes, partial)`` in UID order; *partial* is True
+            for messages rebuilt from a partial fetch.
+        """
+        if prefetched is None:
+            return [(item["uid"], item["items"]["RFC822"], False) for item in self._fetch_items(folder, uids, "(RFC822)") if "RFC822" in item["items"]]
+
+        full_uids, plans = self._plan_download(prefetched)
+        results = []
+        for items, structures in plans.items():
+            rebuilt, retry = _assemble_partials(structures, self._fetch_items(folder, list(structures), items))
+            results.extend(rebuilt)
+            full_uids.extend(retry)
+
+        if plans:
+            logger.debug(
+                "Partial fetch: %d message(s) in %s rebuilt from %d bytes",
+                len(results),
+                folder,
+                sum(len(raw) for _, raw, _ in results),
+            )
+
+        for item in self._fetch_items(folder, sorted(full_uids), "(RFC822)"):
+            if "RFC822" in item["items"]:
+                results.append((item["uid"], item["items"]["RFC822"], False))
+        return sorted(results, key=lambda result: result[0])
+
+    def _fetch_items(self, folder, uids, items):
+        """Run one ``UID FETCH`` for *uids* and return the parsed per-message items in UID order."""
+        if not uids:
             return []
+        status, msg_data = self._conn.uid("FETCH", format_uid_set(uids), items)
+        if status != "OK":
+            logger.warning("Failed to fetch %d message(s) from %s", len(uids), folder)
+            return []
+        return merge_fetch_items(parse_fetch_response(msg_data), uids)
+
+    def noop(self):
+        """Send NOOP to keep the session alive; raises if the connection is gone."""
+        if not self._conn:
+            raise RuntimeError("Not connected. Call connect() first.")
+        self._conn.noop()
+
+    @property
+    def supports_idle(self):
+        """True if the server advertises the IDLE extension."""
+        return bool(self._conn) and "IDLE" in self._conn.capabilities
+
+    def wait_for_changes(self, timeout, stop_event=None):
+        """Wait until the selected folder reports new mail.
+
+        Uses IDLE when the server supports it and otherwise sleeps and
+        polls with NOOP.  Call after :meth:`fetch_messages` so that the
+        folder is still selected.
+
+        Parameters
+        ----------
+        timeout : float
+            Maximum seconds to wait (IDLE is re-issued by the caller after this).
+        stop_event : threading.Event or None
+            Returns early when the event is set.
+
+        Returns
+        -------
+        bool
+            True if the server reported new messages.
+        """
+        if not self._conn:
+            raise RuntimeError("Not connected. Call connect() first.")
+        if self.supports_idle:
+            return self._idle(timeout, stop_event)
+
+        if stop_event is not None:
+            stop_event.wait(timeout)
+        else:
+            time.sleep(timeout)
+        self._conn.response("EXISTS")
+        self._conn.noop()
+        _, data = self._conn.response("EXISTS")
+        return bool(data and data[0] is not None)
+
+    # imaplib only gained IDLE in Python 3.14, so the command is driven through
+    # its tag and line helpers directly.
+    # pylint: disable=protected-access
+    def _idle(self, timeout, stop_event):
+        """Run one IDLE cycle; return True if EXISTS/RECENT arrived before *timeout*."""
+        conn = self._conn
+        tag = conn._new_tag()
+        conn.send(tag + b" IDLE\r\n")
+        changed = False
+        while True:
+            line = conn._get_line()
+            if line.startswith(b"+"):
+                break
+            if line.startswith(tag):
+                raise imaplib.IMAP4.error(f"IDLE rejected: {line.decode(errors='replace')}")
+            changed = changed or bool(_RE_NEW_MAIL.match(line))
+
+        deadline = time.monotonic() + timeout
+        while not changed and time.monotonic() < deadline:
+            if stop_event is not None and stop_event.is_set():
+                break
+            if not self._readable(min(_IDLE_SLICE_SECONDS, max(0.0, deadline - time.monotonic()))):
+                continue
+            line = conn._get_line()
+            changed = bool(_RE_NEW_MAIL.match(line))
+
+        conn.send(b"DONE\r\n")
+        while True:
+            line = conn._get_line()
+            if line.startswith(tag):
+                break
+            changed = changed or bool(_RE_NEW_MAIL.match(line))
+        return changed
+
+    # pylint: enable=protected-access
+
+    def _readable(self, timeout):
+        """Return True if the connection has data to read within *timeout* seconds."""
+        if self._buffered():
+            return True
+        ready, _, _ = select.select([self._conn.sock], [], [], timeout)
+        return bool(ready)
+
+    def _buffered(self):
+        """Return True if a response is already buffered above the socket.
+
+        Servers often send the IDLE continuation and an untagged response
+        in one packet; the latter then sits in the reader of imaplib (or in
+        the TLS layer) where ``select`` does not see it.  The reader is
+        peeked with the socket switched to non-blocking mode, so an empty
+        buffer returns at once instead of waiting for the server.
+        """
+        sock = self._conn.sock
+        timeout = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            return bool(self._conn.file.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            sock.settimeout(timeout)
 
-        msg_ids = data[0].split()
-        logger.debug("Found %d message(s) in %s since %s", len(msg_ids), folder, date_str)
+    def _enable_compress(self):
+        """Negotiate RFC 4978 ``COMPRESS=DEFLATE`` and wrap the connection in raw deflate streams.
 
-        messages = []
-        for msg_id in msg_ids:
-            status, msg_data = self._conn.fetch(msg_id, "(RFC822)")
-            if status == "OK" and msg_data[0] is not None:
-                raw = msg_data[0][1]
-                messages.append(email.message_from_bytes(raw))
+        After the tagged OK both directions are compressed; bytes already
+        buffered by imaplib belong to the compressed stream, so the existing
+        reader is wrapped rather than replaced.
+        """
+        conn = self._conn
+        if "COMPRESS=DEFLATE" not in conn.capabilities:
+            return
+        try:
+            status, _ = conn.xatom("COMPRESS", "DEFLATE")
+        except imaplib.IMAP4.error as exc:
+            logger.debug("COMPRESS rejected by %s: %s", self.account.host, exc)
+            return
+        if status != "OK":
+            return
+
+        conn.file = io.BufferedReader(_InflateReader(conn.file), _COMPRESS_CHUNK)
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+        sock = conn.sock
+
+        def send(data):
+            sock.sendall(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH))
+
+        conn.send = send
+        logger.debug("COMPRESS=DEFLATE enabled on %s", self.account.host)
+
+    def _enable_condstore(self):
+        """Enable CONDSTORE so that SELECT reports ``HIGHESTMODSEQ`` for each folder.
+
+        QRESYNC implies CONDSTORE; only the mod-sequence is needed here
+        because new mail is found through the UID range.
+        """
+        capabilities = self._conn.capabilities
+        if "ENABLE" not in capabilities or not {"CONDSTORE", "QRESYNC"} & set(capabilities):
+            return
+        status, _ = self._conn.enable("CONDSTORE")
+        self._condstore = status == "OK"
+        logger.debug("CONDSTORE %s on %s", "enabled" if self._condstore else "not enabled", self.account.host)
 
-        return messages
+    def _get_response_number(self, code):
+        """Return the numeric value of the *code* response (e.g. ``UIDVALIDITY``) of the last SELECT, or None."""
+        _, data = self._conn.response(code)
+        if not data or data[0] is None:
+            return None
+        try:
+            return int(data[-1])
+        except ValueError:
+            return None
 
     def disconnect(self):
         """Close the IMAP connection gracefully."""
+        self._condstore = False
         if self._conn:
             try:
                 self._conn.close()
@@ -77,3 +535,89 @@ class ImapClient:
                 pass
             self._conn = None
             logger.debug("Disconnected from %s", self.account.host)
+
+
+def _parse_search(data, last_uid):
+    """Return the UIDs of a ``SEARCH`` response above *last_uid* in ascending order."""
+    # "UID n:*" always matches the highest UID, even when it is below n
+    return sorted(uid for uid in (int(raw) for raw in (data or b"").split()) if uid > last_uid)
+
+
+def _assemble_partials(structures, items):
+    """Rebuild partially fetched messages.
+
+    Returns
+    -------
+    tuple[list[tuple[int, bytes, bool]], list[int]]
+        ``(uid, raw_bytes, True)`` entries and the UIDs that must be fetched in full
+        (unusable or missing from the response).
+    """
+    structures = dict(structures)
+    rebuilt = []
+    retry = []
+    for item in items:
+        structure = structures.pop(item["uid"], None)
+        if structure is None:
+            continue
+        raw = assemble_partial_message(structure, item["items"])
+        if raw is None:
+            retry.append(item["uid"])
+        else:
+            rebuilt.append((item["uid"], raw, True))
+    retry.extend(structures)
+    return rebuilt, retry
+
+
+def _find_item(item, prefix):
+    """Return the first body item of a parsed FETCH response whose name starts with *prefix*."""
+    for name, value in item["items"].items():
+        if name.startswith(prefix):
+            return value
+    return None
+
+
+def _message_size(item):
+    """Return the ``RFC822.SIZE`` reported in a phase-one FETCH item, or 0."""
+    size_match = _RE_SIZE.search(item["text"])
+    return int(size_match.group(1)) if size_match else 0
+
+
+def _has_delivery_status(fetch_text, header):
+    """Return True if the BODYSTRUCTURE or Content-Type indicates a DSN report."""
+    if _RE_DSN_STRUCTURE.search(fetch_text):
+        return True
+    return bool(_RE_DSN_REPORT_TYPE.search(header.get("Content-Type", "")))
+
+
+class _InflateReader(io.RawIOBase):
+    """Raw reader that inflates an RFC 4978 deflate stream read from *raw*.
+
+    With the socket in non-blocking mode a read consumes only what is
+    already buffered (the unconsumed tail or data read ahead by *raw*), so
+    :meth:`ImapClient._buffered` also finds responses that were inflated
+    together with the IDLE continuation.
+    """
+
+    def __init__(self, raw):
+        super().__init__()
+        self._raw = raw
+        self._inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while True:
+            data = self._inflater.unconsumed_tail
+            if not data:
+                data = self._raw.read1(_COMPRESS_CHUNK)
+                if not data:
+                    return 0
+            out = self._inflater.decompress(data, len(buffer))
+            if out:
+                buffer[: len(out)] = out
+                return len(out)
+
+    def close(self):
+        self._raw.close()
+        super().close()
@@ -0,0 +1,148 @@
+"""Offline message sources: mbox files, Maildir trees, ``.eml`` files and the raw archive.
+
+:class:`LocalMailSource` yields :class:`email.message.Message` objects
+from local disk with the same ``fetch_messages`` interface as the IMAP
+clients, so archived mailboxes go through the regular scan pipeline.
+"""
+
+import logging
+import mmap
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesHeaderParser
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+from .archive import INDEX_FILE, RawArchive
+from ..utils.email_utils import compute_message_hash, get_header, message_from_raw
+
+logger = logging.getLogger(__name__)
+
+MAIL_SOURCE_FORMATS = ("mbox", "maildir", "eml", "archive")
+
+# Maildir subdirectories holding delivered messages ("tmp" is still being written)
+_MAILDIR_SUBDIRS = ("cur", "new")
+
+
+def detect_format(path):
+    """Guess the mailbox format of *path*.
+
+    Directories with an archive index are a raw archive (see
+    :class:`RawArchive`), directories with a ``cur`` or ``new``
+    subdirectory are Maildir, other directories hold ``.eml`` files.  Files named ``*.eml`` are a single
+    message; any other file is read as mbox.
+    """
+    path = Path(path)
+    if path.is_dir():
+        if (path / INDEX_FILE).is_file():
+            return "archive"
+        return "maildir" if any((path / sub).is_dir() for sub in _MAILDIR_SUBDIRS) else "eml"
+    return "eml" if path.suffix.lower() == ".eml" else "mbox"
+
+
+class LocalMailSource:  # pylint: disable=too-few-public-methods
+    """Reads messages from a local mailbox instead of an IMAP server.
+
+    Parameters
+    ----------
+    fmt : str
+        One of :data:`MAIL_SOURCE_FORMATS`, or ``"auto"`` to detect the
+        format of each path with :func:`detect_format`.
+    """
+
+    def __init__(self, fmt="auto"):
+        self.fmt = fmt
+
+    def fetch_messages(self, folder, days=None, skip_hash=None):
+        """Yield the messages stored at *folder* one at a time.
+
+        Parameters
+        ----------
+        folder : str
+            Path of the mbox file, Maildir directory, ``.eml`` file,
+            directory of ``.eml`` files or raw archive directory.
+        days : int or None
+            Only yield messages whose Date header lies within the last
+            *days* days; None yields all messages.
+        skip_hash : callable or None
+            Called with the hash of each message that has a Message-ID;
+            messages for which it returns True are skipped before the
+            body is parsed.
+
+        Yields
+        ------
+        email.message.Message
+        """
+        fmt = detect_format(folder) if self.fmt == "auto" else self.fmt
+        if fmt == "mbox":
+            raw_messages = _iter_mbox(folder)
+        elif fmt == "archive":
+            raw_messages = RawArchive(folder).iter_raw()
+        elif fmt == "maildir":
+            raw_messages = _iter_files(p for p in Path(folder).rglob("*") if p.parent.name in _MAILDIR_SUBDIRS)
+        else:
+            raw_messages = _iter_files(Path(folder).rglob("*.eml") if Path(folder).is_dir() else [Path(folder)])
+
+        since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+        header_parser = BytesHeaderParser()
+        read_count = 0
+        yielded = 0
+        for raw in raw_messages:
+            read_count += 1
+            if since or skip_hash:
+                header = header_parser.parsebytes(raw)
+                if since and not _is_recent(header, since):
+                    continue
+                if skip_hash and get_header(header, "Message-ID").strip() and skip_hash(compute_message_hash(header)):
+                    continue
+            yielded += 1
+            yield message_from_raw(raw)
+
+        logger.debug("Read %d message(s) from '%s' (%s), %d passed on", read_count, folder, fmt, yielded)
+
+
+# ------------------------------------------------------------------
+# Internal helpers
+# ------------------------------------------------------------------
+
+
+def _iter_mbox(path):
+    """Yield the raw bytes of each message in the mbox file *path*.
+
+    The file is memory-mapped and split on ``From`` separator lines, so
+    only the message being yielded is copied into memory.
+    """
+    with open(path, "rb") as f:
+        if not f.seek(0, 2):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            size = len(mapped)
+            pos = 0 if mapped[:5] == b"From " else mapped.find(b"\nFrom ") + 1
+            if not pos and mapped[:5] != b"From ":
+                logger.warning("'%s' contains no mbox 'From ' separator line", path)
+                return
+            while pos < size:
+                line_end = mapped.find(b"\n", pos)
+                if line_end < 0:
+                    break
+                next_sep = mapped.find(b"\nFrom ", line_end)
+                end = size if next_sep < 0 else next_sep + 1
+                yield mapped[line_end + 1 : end]
+                pos = end
+
+
+def _iter_files(paths):
+    """Yield the contents of the regular files in *paths* in name order."""
+    for path in sorted(paths):
+        if path.is_file():
+            yield path.read_bytes()
+
+
+def _is_recent(header, since):
+    """Return True if the Date header of *header* is not older than *since*; undated messages are kept."""
+    try:
+        sent = parsedate_to_datetime(get_header(header, "Date"))
+    except (TypeError, ValueError):
+        return True
+    if sent.tzinfo is None:
+        sent = sent.replace(tzinfo=timezone.utc)
+    return sent >= since
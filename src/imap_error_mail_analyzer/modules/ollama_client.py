@@ -1,10 +1,19 @@
 """Ollama API client for classifying email delivery errors."""
 
+import functools
+import hashlib
+import json
 import logging
 import re
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import requests
+from requests.adapters import HTTPAdapter, Retry
 
+from .ollama_endpoints import EndpointBalancer, OllamaEndpoint
 from ..utils.categories import (
     VALID_CATEGORIES,
     build_prompt_category_lines,
@@ -14,19 +23,37 @@ from ..utils.categories import (
 logger = logging.getLogger(__name__)
 
 _MAX_BODY_PROMPT_LEN = 1000
+# Shorter bodies per item keep batch prompts within the model context
+_MAX_BATCH_BODY_PROMPT_LEN = 500
 
-_PROMPT_TEMPLATE = """\
-You are an email delivery error analyst.
-Analyze the following 5xx SMTP delivery error and classify it.
+# Output token budget per classified bounce (three short lines)
+_NUM_PREDICT_PER_ITEM = 100
+
+# HTTP timeouts in seconds: connecting, and waiting for the (first) response bytes
+_CONNECT_TIMEOUT = 10
+_READ_TIMEOUT = 120
+
+# Retries of failed connections, timeouts and 5xx responses, with exponential backoff
+_RETRIES = 2
+_RETRY_BACKOFF = 1.0
+_RETRY_STATUSES = (500, 502, 503, 504)
+
+# How long Ollama keeps the model (and its prompt cache) loaded when not configured
+_DEFAULT_KEEP_ALIVE = "30m"
 
+# In-memory results by error signature, so duplicates are classified once per pass
+_MEMO_MAX_ENTRIES = 10000
+
+_ITEM_TEMPLATE = """\
 Error Code: {error_code}
 Error Message: {error_message}
 Failed Recipient: {to_addr}
 
 <body block>
 {body}
-</body block>
+</body block>"""
 
+_INSTRUCTIONS = """\
 Classify into exactly ONE of the following categories:
 {category_lines}
 
@@ -46,44 +73,134 @@ Rate limit distinction:
 
 DNS / domain resolution errors:
 - "Host or domain name not found", "Name service error", "domain not found" for the RECIPIENT domain -> user_unknown (the sender typed a wrong domain, e.g. "yhoo.co.jp" instead of "yahoo.co.jp")
-- SPF/DKIM/DMARC failures on the SENDING side -> config_error
+- SPF/DKIM/DMARC failures on the SENDING side -> config_error"""
+
+# Static part of every request, sent as the system prompt ahead of the
+# bounce data so Ollama can reuse the evaluated prefix between requests
+_SYSTEM_TEMPLATE = (
+    """\
+You are an email delivery error analyst.
+The user message lists one or more numbered 5xx SMTP delivery errors. Analyze each error and classify it independently.
 
-Reply in exactly two lines (no other text):
+"""
+    + _INSTRUCTIONS
+    + """
+
+Reply with exactly three lines per error, in the order given (no other text):
+[<number>]
 CATEGORY: <category>
 REASON: <one short sentence in Japanese>
 
-Example good responses:
+Example good response for three errors:
+[1]
 CATEGORY: ip_block
 REASON: 送信元IPがSpamhausブロックリストに登録されている
-
+[2]
 CATEGORY: user_unknown
 REASON: 宛先メールアドレスが存在しない
-
+[3]
 CATEGORY: domain_block
 REASON: 受信側サーバーが送信元からの接続を拒否している"""
+)
+
+# Volatile parts of error texts masked out of the cache signature, in order
+_SIGNATURE_MASKS = (
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<addr>"),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2})?(?:\.\d+)?(?: ?(?:Z|[+-]\d{2}:?\d{2}))?"), "<time>"),
+    (re.compile(r"\b(?:mon|tue|wed|thu|fri|sat|sun), \d{1,2} \w{3} \d{4}", re.IGNORECASE), "<time>"),
+    (re.compile(r"\b\d{1,2}:\d{2}:\d{2}(?:\.\d+)?\b"), "<time>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}\b"), "<ip>"),
+    (re.compile(r"\b[0-9a-f]{1,4}(?::[0-9a-f]{0,4}){2,7}\b", re.IGNORECASE), "<ip>"),
+    (re.compile(r"\b(?=[\w.-]*\d)(?=[\w.-]*[a-z])[\w.-]{8,}\b", re.IGNORECASE), "<id>"),
+    (re.compile(r"\b\d{5,}\b"), "<n>"),
+)
+_RE_WHITESPACE = re.compile(r"\s+")
 
 _RE_CATEGORY = re.compile(r"CATEGORY\s*:\s*(\S+)", re.IGNORECASE)
 _RE_REASON = re.compile(r"REASON\s*:\s*(.+)", re.IGNORECASE)
-
-
-class OllamaClient:
-    """Thin wrapper around the Ollama ``/api/generate`` endpoint."""
-
-    def __init__(self, base_url, model):
-        self.base_url = base_url.rstrip("/")
+_RE_BATCH_ITEM = re.compile(r"^\W*\[(\d+)\]", re.MULTILINE)
+_RE_COMPLETE_REASON = re.compile(r"REASON\s*:\s*\S.*\n", re.IGNORECASE)
+
+
+def prompt_fingerprint(model):
+    """Return a hash of *model* and the prompt that changes whenever classifications may change."""
+    content = "\0".join((model, _system_prompt(), str(_MAX_BODY_PROMPT_LEN), str(_MAX_BATCH_BODY_PROMPT_LEN)))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class OllamaClient:  # pylint: disable=too-many-instance-attributes
+    """Thin wrapper around the Ollama ``/api/generate`` endpoint of one or more servers.
+
+    With a :class:`RuleClassifier` unambiguous bounces are classified by
+    rule first.  With a :class:`ClassificationCache` bounces whose
+    normalised error signature was classified before are answered from
+    the cache without an HTTP request.  Calls for a signature that is
+    being classified share the in-flight request, and later calls reuse
+    its result from an in-memory memo, so each distinct error is sent
+    once per pass even with the cache disabled.  :meth:`save_cache` ends
+    a pass and clears the memo, so ``cache_ttl_days`` alone decides
+    what is reused across passes.
+
+    :meth:`submit` runs classifications on a pool of *concurrency* worker
+    threads, which bounds the number of requests sent to Ollama at once.
+    Each worker classifies up to *batch_size* queued bounces with one
+    prompt (see :meth:`classify_errors`).
+
+    Every request carries the same static system prompt, followed by the
+    bounce data only, and asks Ollama to keep the model loaded for
+    *keep_alive* so the evaluated system prompt can be reused.  Token
+    counts reported by Ollama are summed up for :meth:`log_stats`.
+
+    Output is capped at ``_NUM_PREDICT_PER_ITEM`` tokens per bounce.  With
+    *stream* the response is read chunk by chunk and the connection is
+    closed as soon as the last bounce has a valid category and a complete
+    reason line, so a model that keeps talking does not delay the result.
+
+    All requests go through one :class:`requests.Session` whose connection
+    pool keeps a connection per concurrent request alive; connection errors,
+    timeouts and 5xx responses are retried with backoff.
+
+    *endpoints* is the base URL of a single server (used by up to
+    *concurrency* requests at once) or a sequence of :class:`OllamaEndpoint`.
+    Each request goes to the least-loaded healthy endpoint (see
+    :class:`EndpointBalancer`); a request that fails is sent once to each
+    other endpoint before falling back.
+    """
+
+    def __init__(self, endpoints, model, cache=None, rules=None, *, concurrency=1, batch_size=1, keep_alive=_DEFAULT_KEEP_ALIVE, stream=False):
+        self.concurrency = max(1, concurrency)
+        if isinstance(endpoints, str):
+            endpoints = [OllamaEndpoint(endpoints, max_concurrency=self.concurrency)]
+        self.balancer = EndpointBalancer(endpoints, self._probe)
         self.model = model
-        self._endpoint = f"{self.base_url}/api/generate"
+        self.cache = cache
+        self.rules = rules
+        self.batch_size = max(1, batch_size)
+        self.keep_alive = keep_alive
+        self.stream = stream
+        self._inflight = {}
+        self._memo = {}
+        self._inflight_lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._queue = deque()
+        self._session = _make_session(self.balancer.endpoints)
+        self._stats = {
+            "requests": 0,
+            "stopped_early": 0,
+            "reported": 0,
+            "seconds": 0.0,
+            "max_seconds": 0.0,
+            "prompt_eval_count": 0,
+            "prompt_eval_duration": 0,
+            "eval_count": 0,
+        }
+        self._endpoint_requests = Counter()
+        self._stats_lock = threading.Lock()
 
     def test_connection(self):
-        """Return True if the Ollama server is reachable and the model is available."""
-        try:
-            resp = requests.get(f"{self.base_url}/api/tags", timeout=10)
-            resp.raise_for_status()
-            models = [m.get("name", "") for m in resp.json().get("models", [])]
-            return any(self.model in m for m in models)
-        except requests.RequestException as exc:
-            logger.warning("Ollama connection test failed: %s", exc)
-            return False
+        """Return True if an Ollama server is reachable and the model is available on it."""
+        return any(self._probe(endpoint) for endpoint in self.balancer.endpoints)
 
     def classify_error(self, bounce_record):
         """Ask Ollama to classify a bounce error.
@@ -91,29 +208,372 @@ class OllamaClient:
         Returns
         -------
         dict
-            ``{"responsible": str, "reason": str, "is_excluded": bool}``
+            ``{"responsible": str, "reason": str, "is_excluded": bool, "classified_by": str}``
+            where ``classified_by`` is ``"rule"``, ``"cache"``, ``"llm"``
+            or ``"fallback"`` (classification failed).
         """
-        body = (bounce_record.body_plain or bounce_record.body_html or "")[:_MAX_BODY_PROMPT_LEN]
-        prompt = _PROMPT_TEMPLATE.format(
-            error_code=bounce_record.error_code,
-            error_message=bounce_record.error_message,
-            to_addr=bounce_record.to_addr,
-            body=body,
-            category_lines=build_prompt_category_lines(),
-        )
+        return self.classify_errors([bounce_record])[0]
 
+    def classify_errors(self, bounce_records):
+        """Classify several bounces, sending those that need Ollama *batch_size* at a time.
+
+        A batch is one prompt listing the bounces as numbered items and
+        asking for one ``CATEGORY``/``REASON`` pair per item.  Items whose
+        answer is missing or invalid are classified again on their own.
+
+        Returns
+        -------
+        list[dict]
+            One classification per bounce, in input order (see :meth:`classify_error`).
+        """
+        results = [None] * len(bounce_records)
+        leaders = {}
+        waits = []
+        for index, bounce in enumerate(bounce_records):
+            results[index] = self._lookup(bounce)
+            if results[index] is not None:
+                continue
+            signature = _error_signature(bounce)
+            with self._inflight_lock:
+                memo = self._memo.get(signature)
+                future = self._inflight.get(signature)
+                if memo is None and future is None:
+                    future = self._inflight[signature] = Future()
+                    leaders[signature] = (future, signature, bounce)
+                elif memo is None and signature not in leaders:
+                    logger.debug("Joining in-flight classification %s", signature[:12])
+            if memo is not None:
+                results[index] = dict(memo)
+            else:
+                waits.append((index, future))
+
+        owned = list(leaders.values())
         try:
-            resp = requests.post(
-                self._endpoint,
-                json={"model": self.model, "prompt": prompt, "stream": False},
-                timeout=120,
+            for start in range(0, len(owned), self.batch_size):
+                chunk = owned[start : start + self.batch_size]
+                for (future, signature, _), result in zip(chunk, self._generate_batch([bounce for _, _, bounce in chunk])):
+                    # Fallback results are retried next time instead of being cached
+                    if result["responsible"] in VALID_CATEGORIES:
+                        self._remember(signature, result)
+                    future.set_result(result)
+        except BaseException as exc:
+            for future, _, _ in owned:
+                if not future.done():
+                    future.set_exception(exc)
+            raise
+        finally:
+            with self._inflight_lock:
+                for key in leaders:
+                    del self._inflight[key]
+
+        for index, future in waits:
+            results[index] = dict(future.result())
+        return results
+
+    def submit(self, bounce_record):
+        """Classify *bounce_record* on the worker pool; returns a :class:`concurrent.futures.Future`."""
+        future = Future()
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="classify")
+            self._queue.append((bounce_record, future))
+            self._executor.submit(self._classify_queued)
+        return future
+
+    def close(self):
+        """Wait for submitted classifications, stop the worker pool and close idle connections."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self._session.close()
+
+    def save_cache(self):
+        """Persist the classification cache, if any, and clear the in-memory memo at the end of a pass."""
+        with self._inflight_lock:
+            self._memo.clear()
+        if self.cache is not None:
+            self.cache.save()
+
+    def log_stats(self):
+        """Log the number of Ollama requests, their latency and average prompt-eval token count since the last call.
+
+        Token counts come from the final response of Ollama, so the
+        averages only cover requests that reported them; streams closed
+        early (and responses without counts) are logged as a separate count.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+            self._stats.update(dict.fromkeys(self._stats, 0))
+            endpoint_requests, self._endpoint_requests = self._endpoint_requests, Counter()
+        if not stats["requests"]:
+            return
+        logger.info(
+            "Ollama: %d request(s) (%d stopped early), %.2fs average and %.2fs max per request",
+            stats["requests"],
+            stats["stopped_early"],
+            stats["seconds"] / stats["requests"],
+            stats["max_seconds"],
+        )
+        if stats["reported"]:
+            logger.info(
+                "Ollama tokens over %d response(s) with counts (%d without): %.0f prompt-eval token(s) and %.2fs prompt eval per response, "
+                "%d output token(s) in total",
+                stats["reported"],
+                stats["requests"] - stats["reported"],
+                stats["prompt_eval_count"] / stats["reported"],
+                stats["prompt_eval_duration"] / stats["reported"] / 1e9,
+                stats["eval_count"],
             )
-            resp.raise_for_status()
-            raw_text = resp.json().get("response", "")
-            return _parse_response(raw_text)
-        except requests.RequestException as exc:
-            logger.warning("Ollama request failed: %s", exc)
+        else:
+            logger.info("Ollama tokens: no response reported counts (streams closed early); set ollama.stream to false to measure prompt evaluation")
+        if len(self.balancer.endpoints) > 1:
+            logger.info("Ollama requests per endpoint: %s", ", ".join(f"{url}: {count}" for url, count in endpoint_requests.items()))
+
+    def _remember(self, signature, result):
+        """Store a valid classification in the memo and the cache; the oldest memo entry is dropped when full."""
+        if self.cache is not None:
+            self.cache.put(signature, result)
+        with self._inflight_lock:
+            self._memo[signature] = result
+            if len(self._memo) > _MEMO_MAX_ENTRIES:
+                del self._memo[next(iter(self._memo))]
+
+    def _lookup(self, bounce_record):
+        """Return the rule or cache classification of a bounce, or None if Ollama has to be asked."""
+        if self.rules is not None:
+            result = self.rules.classify(bounce_record)
+            if result is not None:
+                return result
+        if self.cache is not None:
+            cached = self.cache.get(_error_signature(bounce_record))
+            if cached is not None:
+                return {**cached, "is_excluded": is_excluded_category(cached["responsible"]), "classified_by": "cache"}
+        return None
+
+    def _classify_queued(self):
+        """Worker task: classify up to *batch_size* bounces waiting in the submit queue.
+
+        Every :meth:`submit` schedules one task, so a task may find the
+        queue already emptied by the batch of an earlier one.
+        """
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                bounce, future = self._queue.popleft()
+            except IndexError:
+                break
+            if future.set_running_or_notify_cancel():
+                batch.append((bounce, future))
+        if not batch:
+            return
+        try:
+            results = self.classify_errors([bounce for bounce, _ in batch])
+        except BaseException as exc:  # pylint: disable=broad-exception-caught
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _generate_batch(self, bounce_records):
+        """Classify *bounce_records* with one prompt; invalid answers are retried per bounce."""
+        if len(bounce_records) == 1:
+            return [self._generate(bounce_records[0])]
+
+        raw_text = self._request(_build_prompt(bounce_records), len(bounce_records))
+        if raw_text is None:
+            return [_fallback() for _ in bounce_records]
+        results = _parse_batch_response(raw_text, len(bounce_records))
+        for index, bounce in enumerate(bounce_records):
+            if results[index]["classified_by"] == "fallback":
+                logger.debug("Batch item %d of %d invalid; classifying %s on its own", index + 1, len(bounce_records), bounce.to_addr)
+                results[index] = self._generate(bounce)
+        return results
+
+    def _generate(self, bounce_record):
+        """Classify a single bounce, falling back on request errors."""
+        raw_text = self._request(_build_prompt([bounce_record]), 1)
+        if raw_text is None:
             return _fallback()
+        return _parse_response(raw_text)
+
+    def _request(self, prompt, count):
+        """Return Ollama's response text for *prompt* listing *count* bounces, or None if the request failed."""
+        payload = {
+            "model": self.model,
+            "system": _system_prompt(),
+            "prompt": prompt,
+            "stream": self.stream,
+            "keep_alive": self.keep_alive,
+            # Anything after the last item is not parsed
+            "options": {"num_predict": _NUM_PREDICT_PER_ITEM * count, "stop": [f"\n[{count + 1}]"]},
+        }
+        tried = set()
+        while (endpoint := self.balancer.acquire(exclude=tried)) is not None:
+            tried.add(endpoint)
+            started = time.monotonic()
+            try:
+                raw_text, data = self._post(endpoint, payload, count)
+            except requests.RequestException as exc:
+                self.balancer.release(endpoint, ok=False)
+                logger.warning("Ollama request to %s failed after %.2fs: %s", endpoint.base_url, time.monotonic() - started, exc)
+                continue
+            except ValueError as exc:
+                # The server answered, so the endpoint stays in rotation
+                self.balancer.release(endpoint, ok=True)
+                logger.warning("Ollama request to %s failed after %.2fs: %s", endpoint.base_url, time.monotonic() - started, exc)
+                return None
+            self.balancer.release(endpoint, ok=True)
+            self._record_stats(endpoint, data, time.monotonic() - started)
+            return raw_text
+        return None
+
+    def _post(self, endpoint, payload, count):
+        """Send *payload* to the generate API of *endpoint*; returns ``(raw_text, data)`` like :func:`_read_stream`."""
+        with self._session.post(f"{endpoint.base_url}/api/generate", json=payload, timeout=(_CONNECT_TIMEOUT, _READ_TIMEOUT), stream=self.stream) as resp:
+            resp.raise_for_status()
+            if self.stream:
+                return _read_stream(resp, count)
+            data = resp.json()
+            return data.get("response", ""), data
+
+    def _probe(self, endpoint):
+        """Return True if *endpoint* answers ``/api/tags`` and has the model."""
+        try:
+            resp = self._session.get(f"{endpoint.base_url}/api/tags", timeout=(_CONNECT_TIMEOUT, 10))
+            resp.raise_for_status()
+            models = [m.get("name", "") for m in resp.json().get("models", [])]
+        except (requests.RequestException, ValueError) as exc:
+            logger.warning("Ollama connection test of %s failed: %s", endpoint.base_url, exc)
+            return False
+        if not any(self.model in m for m in models):
+            logger.warning("Model '%s' is not available on %s", self.model, endpoint.base_url)
+            return False
+        return True
+
+    def _record_stats(self, endpoint, data, seconds):
+        """Add the latency and token counts of a request to the statistics; *data* is None for streams closed early."""
+        with self._stats_lock:
+            self._endpoint_requests[endpoint.base_url] += 1
+            self._stats["requests"] += 1
+            self._stats["seconds"] += seconds
+            self._stats["max_seconds"] = max(self._stats["max_seconds"], seconds)
+            if data is None:
+                self._stats["stopped_early"] += 1
+            elif "prompt_eval_count" in data:
+                self._stats["reported"] += 1
+                for key in ("prompt_eval_count", "prompt_eval_duration", "eval_count"):
+                    self._stats[key] += data.get(key, 0)
+        data = data or {}
+        logger.debug(
+            "Ollama request to %s: %.2fs, %s prompt-eval token(s) in %.2fs, %s output token(s)",
+            endpoint.base_url,
+            seconds,
+            data.get("prompt_eval_count", "?"),
+            data.get("prompt_eval_duration", 0) / 1e9,
+            data.get("eval_count", "?"),
+        )
+
+
+def _format_item(bounce_record, max_body_len):
+    """Return the prompt block describing one bounce."""
+    return _ITEM_TEMPLATE.format(
+        error_code=bounce_record.error_code,
+        error_message=bounce_record.error_message,
+        to_addr=bounce_record.to_addr,
+        body=(bounce_record.body_plain or bounce_record.body_html or "")[:max_body_len],
+    )
+
+
+def _make_session(endpoints):
+    """Return a session keeping a connection per concurrent request to *endpoints* alive and retrying transient failures."""
+    retry = Retry(
+        total=_RETRIES,
+        backoff_factor=_RETRY_BACKOFF,
+        status_forcelist=_RETRY_STATUSES,
+        # Classification requests have no side effects, so POST is safe to repeat
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=len(endpoints),
+        pool_maxsize=max(endpoint.max_concurrency for endpoint in endpoints),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _read_stream(resp, count):
+    """Read a streamed ``/api/generate`` response until it is done or the answer for *count* bounces is complete.
+
+    Returns
+    -------
+    tuple[str, dict or None]
+        The response text and the final chunk with Ollama's statistics,
+        or None when reading stopped before the end of the stream.
+    """
+    pieces = []
+    for line in resp.iter_lines():
+        if not line:
+            continue
+        chunk = json.loads(line)
+        if "error" in chunk:
+            raise ValueError(chunk["error"])
+        piece = chunk.get("response", "")
+        pieces.append(piece)
+        if chunk.get("done"):
+            return "".join(pieces), chunk
+        if "\n" in piece and _answer_complete("".join(pieces), count):
+            logger.debug("Closing the Ollama stream after a complete answer")
+            return "".join(pieces), None
+    return "".join(pieces), {}
+
+
+def _answer_complete(raw_text, count):
+    """Return True once item *count* has a valid category followed by a complete reason line."""
+    if count > 1:
+        parts = _RE_BATCH_ITEM.split(raw_text)
+        if len(parts) < 3 or int(parts[-2]) < count:
+            return False
+        raw_text = parts[-1]
+    cat_match = _RE_CATEGORY.search(raw_text)
+    if not cat_match or cat_match.group(1).lower().strip() not in VALID_CATEGORIES:
+        return False
+    return _RE_COMPLETE_REASON.search(raw_text, cat_match.end()) is not None
+
+
+@functools.cache
+def _system_prompt():
+    """Return the static system prompt: instructions, categories, reply format and examples."""
+    return _SYSTEM_TEMPLATE.format(category_lines=build_prompt_category_lines())
+
+
+def _build_prompt(bounce_records):
+    """Return the user prompt listing *bounce_records* as numbered items.
+
+    Only the bounce data goes here; everything static is in the system prompt.
+    """
+    max_body_len = _MAX_BODY_PROMPT_LEN if len(bounce_records) == 1 else _MAX_BATCH_BODY_PROMPT_LEN
+    return "\n\n".join(f"[{number}]\n{_format_item(bounce, max_body_len)}" for number, bounce in enumerate(bounce_records, 1))
+
+
+def _error_signature(bounce_record):
+    """Return the cache key of a bounce: error code and error text with volatile parts masked.
+
+    Addresses, timestamps, IP addresses, queue IDs and long numbers are
+    replaced by placeholders so the same rejection reported for different
+    recipients or deliveries maps to one key.  Without an error message
+    the start of the body is used instead.
+    """
+    text = bounce_record.error_message or (bounce_record.body_plain or bounce_record.body_html or "")[:_MAX_BODY_PROMPT_LEN]
+    for pattern, placeholder in _SIGNATURE_MASKS:
+        text = pattern.sub(placeholder, text)
+    text = _RE_WHITESPACE.sub(" ", text).strip().lower()
+    return hashlib.sha256(f"{bounce_record.error_code}|{text}".encode("utf-8")).hexdigest()
 
 
 def _parse_response(raw_text):
@@ -132,13 +592,25 @@ def _parse_response(raw_text):
         "responsible": responsible,
         "reason": reason,
         "is_excluded": is_excluded_category(responsible),
+        "classified_by": "llm",
     }
 
 
+def _parse_batch_response(raw_text, count):
+    """Parse the numbered classifications of a batch response; missing or invalid items are fallbacks."""
+    parts = _RE_BATCH_ITEM.split(raw_text)
+    sections = {}
+    # parts alternates between item numbers and the text that follows them
+    for number, text in zip(parts[1::2], parts[2::2]):
+        sections[int(number)] = sections.get(int(number), "") + text
+    return [_parse_response(sections.get(number, "")) for number in range(1, count + 1)]
+
+
 def _fallback(reason=""):
     """Return a safe default when classification fails."""
     return {
         "responsible": "unknown",
         "reason": reason or "Classification unavailable",
         "is_excluded": False,
+        "classified_by": "fallback",
     }
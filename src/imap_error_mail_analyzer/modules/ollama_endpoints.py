@@ -0,0 +1,123 @@
+"""Load balancing and health tracking for the Ollama servers used by :class:`OllamaClient`."""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Delay before a failed endpoint is probed again: first delay and upper bound in seconds
+_PROBE_BACKOFF_BASE = 15
+_PROBE_BACKOFF_MAX = 300
+
+
+@dataclass(eq=False)
+class OllamaEndpoint:  # pylint: disable=too-many-instance-attributes
+    """One Ollama server with its share of the load and its health state.
+
+    Parameters
+    ----------
+    base_url : str
+        URL of the Ollama API.
+    weight : float
+        Relative share of the requests; an endpoint with weight 2 is
+        given twice as many concurrent requests as one with weight 1.
+    max_concurrency : int
+        Maximum number of requests sent to the endpoint at once.
+    """
+
+    base_url: str
+    weight: float = 1
+    max_concurrency: int = 1
+    active: int = 0
+    healthy: bool = True
+    probing: bool = False
+    failures: int = 0
+    retry_at: float = 0.0
+
+    def __post_init__(self):
+        self.base_url = self.base_url.rstrip("/")
+
+
+class EndpointBalancer:
+    """Hands out the least-loaded healthy endpoint for each request.
+
+    Load is the number of active requests divided by the weight.  An
+    endpoint whose request failed is taken out of rotation; once its
+    backoff has expired the next :meth:`acquire` calls *probe* on it and
+    puts it back if the probe succeeds.  While no endpoint is healthy,
+    requests go to the one due for a retry soonest, so a single server
+    is still tried on every request.
+
+    Parameters
+    ----------
+    endpoints : sequence of OllamaEndpoint
+        Servers in order of preference for equally loaded endpoints.
+    probe : callable
+        Called with an endpoint; returns True if it can serve requests.
+    """
+
+    def __init__(self, endpoints, probe):
+        self.endpoints = list(endpoints)
+        self._probe = probe
+        self._cond = threading.Condition()
+
+    def acquire(self, exclude=()):
+        """Reserve a request slot and return its endpoint; waits while all candidates are busy.
+
+        Returns None when every endpoint is in *exclude* (already tried for this request).
+        """
+        self._probe_due(exclude)
+        with self._cond:
+            while True:
+                candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+                if not candidates:
+                    return None
+                usable = [endpoint for endpoint in candidates if endpoint.healthy] or [min(candidates, key=lambda endpoint: endpoint.retry_at)]
+                free = [endpoint for endpoint in usable if endpoint.active < endpoint.max_concurrency]
+                if free:
+                    endpoint = min(free, key=lambda endpoint: (endpoint.active + 1) / endpoint.weight)
+                    endpoint.active += 1
+                    return endpoint
+                self._cond.wait()
+
+    def release(self, endpoint, ok):
+        """Free the slot taken by :meth:`acquire`; *ok* is False if the request failed."""
+        with self._cond:
+            endpoint.active -= 1
+            self._set_health(endpoint, ok)
+            self._cond.notify_all()
+
+    def _probe_due(self, exclude):
+        """Probe the failed endpoints whose backoff has expired."""
+        now = time.monotonic()
+        with self._cond:
+            due = [
+                endpoint
+                for endpoint in self.endpoints
+                if not endpoint.healthy and not endpoint.probing and endpoint.retry_at <= now and endpoint not in exclude
+            ]
+            for endpoint in due:
+                endpoint.probing = True
+        for endpoint in due:
+            ok = self._probe(endpoint)
+            with self._cond:
+                endpoint.probing = False
+                self._set_health(endpoint, ok)
+                self._cond.notify_all()
+
+    def _set_health(self, endpoint, ok):
+        """Update the health state of *endpoint*; called with the lock held."""
+        if ok:
+            if not endpoint.healthy:
+                logger.info("Ollama endpoint %s is back in rotation", endpoint.base_url)
+            endpoint.healthy = True
+            endpoint.failures = 0
+            return
+        endpoint.failures += 1
+        delay = min(_PROBE_BACKOFF_BASE * 2 ** (endpoint.failures - 1), _PROBE_BACKOFF_MAX)
+        endpoint.retry_at = time.monotonic() + delay
+        if endpoint.healthy:
+            logger.warning("Ollama endpoint %s taken out of rotation; probing again in %ds", endpoint.base_url, delay)
+        endpoint.healthy = False
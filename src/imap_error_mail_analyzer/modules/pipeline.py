@@ -0,0 +1,202 @@
+"""Backend-independent stages of a scan: parsing, record collection and account reports."""
+
+import logging
+from collections import deque
+from concurrent.futures import wait
+
+from .bounce_parser import extract_bounces
+from .cache import ProcessedCache, SyncState
+from .html_report import write_html_report
+from .report import build_record, write_reports
+from ..utils.email_utils import compute_message_hash, get_raw_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class FolderScan:
+    """Collects the classified bounce records of one folder scan.
+
+    The IMAP backends drive the scan and perform the classification;
+    this class decides which messages need classifying and keeps the
+    processed cache up to date.  With an *archive* the raw bytes of every
+    new bounce message are stored before it is classified; messages
+    rebuilt from a partial fetch are not archived because their bytes
+    are not the message as stored on the server.
+
+    Messages whose classification runs on the worker pool are
+    :meth:`queue`-d with one future per bounce; :meth:`collect` records
+    them in the order they were queued, so the report order does not
+    depend on which request finishes first.  *max_pending* is the number
+    of queued messages after which the backend waits before fetching more.
+
+    Each new message is claimed in the processed cache before it is
+    parsed, so scans of other folders sharing the cache skip it; the
+    backend calls :meth:`release` when the scan ends to free the claims of
+    messages that were not recorded.
+    """
+
+    def __init__(self, folder, account_config, cache, archive=None, *, max_pending=0):
+        self.folder = folder
+        self.account_config = account_config
+        self.cache = cache
+        self.archive = archive
+        self.max_pending = max_pending
+        self.target_records = []
+        self.excluded_records = []
+        self.processed_count = 0
+        self._pending = deque()
+        self._claimed = set()
+
+    def parse(self, msg):
+        """Return ``(msg_hash, bounces)`` for *msg*.
+
+        ``bounces`` is empty when the message was processed before, is
+        being processed by another scan or contains no 5xx error; the
+        latter is marked processed right away.
+        """
+        msg_hash = compute_message_hash(msg)
+        if not self.cache.claim(msg_hash):
+            return msg_hash, []
+        self._claimed.add(msg_hash)
+
+        bounces = extract_bounces(msg, folder=self.folder, sender_address=self.account_config.username)
+        if not bounces:
+            self._mark_processed(msg_hash)
+        elif self.archive is not None:
+            if getattr(msg, "partial", False):
+                logger.debug("Not archiving partially fetched message %s", msg_hash)
+            else:
+                self.archive.store(msg_hash, get_raw_bytes(msg), account=self.account_config.name, folder=self.folder)
+        return msg_hash, bounces
+
+    def add(self, bounce, classification):
+        """Store the record of a classified bounce."""
+        label = "excluded" if classification["is_excluded"] else "target"
+        logger.debug(
+            "5xx [%s] %s -> %s",
+            bounce.error_code,
+            label,
+            bounce.to_addr,
+        )
+        record = build_record(bounce, classification)
+
+        if classification["is_excluded"]:
+            self.excluded_records.append(record)
+        else:
+            self.target_records.append(record)
+
+    def complete(self, msg_hash):
+        """Mark the message whose bounces were all added as processed."""
+        self._mark_processed(msg_hash)
+        self.processed_count += 1
+
+    def queue(self, msg_hash, bounces, futures):
+        """Queue a message whose *bounces* are being classified by *futures* (one per bounce)."""
+        self._pending.append((msg_hash, bounces, futures))
+
+    @property
+    def backlog(self):
+        """Number of queued messages not yet recorded."""
+        return len(self._pending)
+
+    def oldest_futures(self):
+        """Return the classification futures of the oldest queued message."""
+        return self._pending[0][2] if self._pending else []
+
+    def collect(self):
+        """Record the queued messages, oldest first, up to the first one still being classified."""
+        while self._pending and all(future.done() for future in self._pending[0][2]):
+            msg_hash, bounces, futures = self._pending.popleft()
+            for bounce, future in zip(bounces, futures):
+                self.add(bounce, future.result())
+            self.complete(msg_hash)
+
+    def drain(self, limit=0):
+        """Block until at most *limit* queued messages are left unrecorded."""
+        self.collect()
+        while len(self._pending) > limit:
+            wait(self.oldest_futures())
+            self.collect()
+
+    def result(self):
+        """Return ``(target_records, excluded_records, processed_count)``."""
+        return self.target_records, self.excluded_records, self.processed_count
+
+    def release(self):
+        """Release the claims of messages that were not recorded, so a later scan picks them up again."""
+        for msg_hash in self._claimed:
+            self.cache.release(msg_hash)
+        self._claimed.clear()
+
+    def _mark_processed(self, msg_hash):
+        self.cache.mark_processed(msg_hash)
+        self._claimed.discard(msg_hash)
+
+
+def open_account_state(log_dir, account_name, days, *, full_scan=False):
+    """Load the processed cache (purged to *days*) and UID sync state of an account."""
+    logger.debug("--- Processing account: %s ---", account_name)
+    cache = ProcessedCache(f"{log_dir}/cache", account_name)
+    cache.purge_older_than(days)
+    sync_state = SyncState(f"{log_dir}/cache", account_name)
+    if full_scan:
+        sync_state.clear()
+    return cache, sync_state
+
+
+def save_account_state(cache, sync_state):
+    """Persist the processed cache and UID sync state of an account."""
+    cache.save()
+    sync_state.save()
+
+
+def finish_account(account_name, account_config, results, log_dir):
+    """Merge per-folder results in folder order, write the account reports and return its summary.
+
+    Returns
+    -------
+    dict[str, int]
+        Count of all bounce records grouped by ``ai_responsible_party``.
+    """
+    target_records = []
+    excluded_records = []
+    processed_count = 0
+    for folder in account_config.check:
+        if folder in results:
+            folder_target, folder_excluded, folder_count = results[folder]
+            target_records.extend(folder_target)
+            excluded_records.extend(folder_excluded)
+            processed_count += folder_count
+
+    write_reports(log_dir, account_name, target_records, excluded_records)
+
+    logger.info(
+        "Account '%s': %d bounce(s) processed, %d target, %d excluded (user)",
+        account_name,
+        processed_count,
+        len(target_records),
+        len(excluded_records),
+    )
+
+    summary = {}
+    for rec in target_records + excluded_records:
+        party = rec["ai_responsible_party"]
+        summary[party] = summary.get(party, 0) + 1
+    return summary
+
+
+def publish_folder_scan(config, account_config, folder, result):
+    """Append the new records of a single folder scan (``watch``, ``ingest``) to the daily reports and refresh the HTML report."""
+    target_records, excluded_records, processed_count = result
+    if not processed_count:
+        return
+    write_reports(config.log_dir, account_config.name, target_records, excluded_records)
+    logger.info(
+        "Account '%s' folder '%s': %d new bounce(s), %d target, %d excluded (user)",
+        account_config.name,
+        folder,
+        processed_count,
+        len(target_records),
+        len(excluded_records),
+    )
+    write_html_report(config.log_dir, config.report_dir)
@@ -2,9 +2,13 @@
 
 import json
 import logging
+import re
+from dataclasses import fields
 from datetime import datetime
 from pathlib import Path
 
+from .bounce_parser import BounceRecord
+
 logger = logging.getLogger(__name__)
 
 FIELD_KEYS = [
@@ -14,6 +18,7 @@ FIELD_KEYS = [
     "error_message",
     "ai_responsible_party",
     "ai_reason",
+    "classified_by",
     "from_addr",
     "to_addr",
     "subject",
@@ -24,6 +29,124 @@ FIELD_KEYS = [
     "delivery_status",
 ]
 
+_RE_REPORT_FILE = re.compile(r"^\d{8}_(.+)_(target|excluded)\.json$")
+
+
+def build_record(bounce, classification):
+    """Merge bounce data and AI classification into a flat dict for reporting."""
+    return {
+        "date": bounce.date,
+        "folder": bounce.folder,
+        "error_code": bounce.error_code,
+        "error_message": bounce.error_message,
+        "ai_responsible_party": classification["responsible"],
+        "ai_reason": classification["reason"],
+        "classified_by": classification["classified_by"],
+        "from_addr": bounce.from_addr,
+        "to_addr": bounce.to_addr,
+        "subject": bounce.subject,
+        "body_plain": bounce.body_plain,
+        "body_html": bounce.body_html,
+        "body_plain_original": bounce.body_plain_original,
+        "body_html_original": bounce.body_html_original,
+        "delivery_status": bounce.delivery_status,
+    }
+
+
+def bounce_from_record(record):
+    """Rebuild the :class:`BounceRecord` a report record was created from.
+
+    Only the bounce fields are restored; the AI classification is dropped.
+    """
+    return BounceRecord(**{f.name: record.get(f.name, {} if f.name == "delivery_status" else "") for f in fields(BounceRecord)})
+
+
+def reclassify_record(record, classification):
+    """Return a copy of *record* with its AI classification replaced."""
+    updated = dict(record)
+    updated["ai_responsible_party"] = classification["responsible"]
+    updated["ai_reason"] = classification["reason"]
+    updated["classified_by"] = classification["classified_by"]
+    return updated
+
+
+def parse_report_name(name):
+    """Return ``(account_name, report_type)`` of a report file name, or None if it is not a report file.
+
+    *report_type* is ``"target"`` or ``"excluded"``.
+    """
+    match = _RE_REPORT_FILE.match(name)
+    return match.groups() if match else None
+
+
+def list_report_accounts(log_dir, date_str):
+    """Return the sorted names of the accounts that have report files for *date_str*."""
+    accounts = set()
+    for path in Path(log_dir).glob(f"{date_str}_*_*.json"):
+        parsed = parse_report_name(path.name)
+        if parsed:
+            accounts.add(parsed[0])
+    return sorted(accounts)
+
+
+def read_report_file(path):
+    """Return the records stored in the report file *path*.
+
+    Returns
+    -------
+    list[dict] or None
+        An empty list if the file is missing, None if it cannot be read
+        or does not hold a list of records.
+    """
+    path = Path(path)
+    if not path.exists():
+        return []
+    try:
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+    except (json.JSONDecodeError, OSError) as exc:
+        logger.warning("Failed to read %s: %s", path, exc)
+        return None
+    if not isinstance(records, list):
+        logger.warning("Failed to read %s: not a list of records", path)
+        return None
+    return records
+
+
+def read_reports(log_dir, date_str, account_name):
+    """Return ``(target_records, excluded_records)`` of an account for *date_str*.
+
+    A missing file yields an empty list.  Returns None if either file
+    cannot be read or parsed, so that callers rewriting the reports do not
+    replace records they could not load.
+    """
+    out_dir = Path(log_dir)
+    target_records = read_report_file(out_dir / f"{date_str}_{account_name}_target.json")
+    excluded_records = read_report_file(out_dir / f"{date_str}_{account_name}_excluded.json")
+    if target_records is None or excluded_records is None:
+        return None
+    return target_records, excluded_records
+
+
+def replace_reports(log_dir, date_str, account_name, target_records, excluded_records):
+    """Overwrite the report files of an account for *date_str*.
+
+    Unlike :func:`write_reports` existing records are replaced, not
+    appended to.  A file whose record list is empty is removed.
+    """
+    out_dir = Path(log_dir)
+    for suffix, records in (("target", target_records), ("excluded", excluded_records)):
+        path = out_dir / f"{date_str}_{account_name}_{suffix}.json"
+        if records:
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+            tmp_path.replace(path)
+            logger.debug("Report: %s (%d records)", path, len(records))
+        elif path.exists():
+            path.unlink()
+            logger.debug("Removed empty report %s", path)
+
 
 def write_reports(log_dir, account_name, target_records, excluded_records):
     """Write target and excluded bounce records to date-stamped JSON files.
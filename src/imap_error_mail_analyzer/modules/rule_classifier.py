@@ -0,0 +1,71 @@
+"""Deterministic pre-classification of unambiguous bounces."""
+
+import logging
+import re
+
+from ..utils.categories import CLASSIFICATION_RULES, is_excluded_category
+
+logger = logging.getLogger(__name__)
+
+_RE_ENHANCED_STATUS = re.compile(r"\b([245]\.\d{1,3}\.\d{1,3})\b")
+
+
+class RuleClassifier:  # pylint: disable=too-few-public-methods
+    """Classifies bounces by enhanced status code and error text.
+
+    Parameters
+    ----------
+    rules : sequence of dict
+        Rules in the format of :data:`CLASSIFICATION_RULES`, tried in order.
+    """
+
+    def __init__(self, rules=CLASSIFICATION_RULES):
+        self._rules = [
+            (
+                rule["category"],
+                frozenset(rule.get("status", ())),
+                [re.compile(pattern, re.IGNORECASE) for pattern in rule.get("patterns", ())],
+                rule["reason"],
+            )
+            for rule in rules
+        ]
+
+    def classify(self, bounce_record):
+        """Return the classification of the first matching rule, or None if the bounce needs the LLM.
+
+        Returns
+        -------
+        dict or None
+            ``{"responsible": str, "reason": str, "is_excluded": bool, "classified_by": "rule"}``
+        """
+        status = _enhanced_status(bounce_record)
+        delivery_status = bounce_record.delivery_status or {}
+        text = " ".join(filter(None, (bounce_record.error_message, delivery_status.get("diagnostic_code", ""))))
+
+        for category, statuses, patterns, reason in self._rules:
+            if statuses and status not in statuses:
+                continue
+            if patterns and not any(pattern.search(text) for pattern in patterns):
+                continue
+            logger.debug("Rule match: %s (status %s) -> %s", bounce_record.to_addr, status or "-", category)
+            return {
+                "responsible": category,
+                "reason": reason,
+                "is_excluded": is_excluded_category(category),
+                "classified_by": "rule",
+            }
+        return None
+
+
+def _enhanced_status(bounce_record):
+    """Return the enhanced status code of a bounce (``"5.1.1"``), or an empty string.
+
+    The DSN ``Status`` field is preferred; otherwise the first code found
+    in the error code or message is used.
+    """
+    status = (bounce_record.delivery_status or {}).get("status", "")
+    for text in (status, bounce_record.error_code, bounce_record.error_message):
+        match = _RE_ENHANCED_STATUS.search(text or "")
+        if match:
+            return match.group(1)
+    return ""
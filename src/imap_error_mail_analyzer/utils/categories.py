@@ -8,6 +8,16 @@ Each category entry contains:
     prompt      : str  -- English description injected into the Ollama prompt.
     excluded    : bool -- If True the category is excluded from target reports
                           (not actionable by the sender).
+
+CLASSIFICATION_RULES lists the unambiguous bounces that are classified
+without asking Ollama.  Rules are tried in order and the first match wins.
+Each rule contains:
+    category : str             -- Category assigned on a match.
+    status   : tuple[str, ...] -- Enhanced status codes (e.g. "5.1.1"); the
+                                  rule only applies to these when given.
+    patterns : tuple[str, ...] -- Case-insensitive regexes searched in the
+                                  error message; one must match when given.
+    reason   : str             -- Japanese reason stored with the record.
 """
 
 CATEGORIES = {
@@ -72,3 +82,48 @@ def build_prompt_category_lines():
         - domain_block : Sending domain blocked ...
     """
     return "\n".join(f"- {key} : {info['prompt']}" for key, info in CATEGORIES.items())
+
+
+CLASSIFICATION_RULES = (
+    {
+        "category": "ip_block",
+        "patterns": (
+            r"\b(?:zen|sbl|xbl|pbl|sbl-xbl)\.spamhaus\.org\b",
+            r"\bbl\.spamcop\.net\b",
+            r"\bb\.barracudacentral\.org\b",
+            r"\bclient host \[?[0-9a-f.:]+\]? blocked\b",
+        ),
+        "reason": "送信元IPがブロックリストに登録されている",
+    },
+    {
+        "category": "user_rate_limit",
+        "patterns": (r"receiving mail at a rate that\s+prevents additional messages",),
+        "reason": "宛先ユーザーの受信レート制限により配信できない",
+    },
+    {
+        "category": "config_error",
+        "status": ("5.7.23", "5.7.25", "5.7.26", "5.7.27"),
+        "reason": "送信元の認証(SPF/DKIM/DMARC)または逆引きDNSの設定に問題がある",
+    },
+    {
+        "category": "config_error",
+        "patterns": (r"\brelay(?:ing)? (?:access )?(?:denied|not permitted)\b",),
+        "reason": "送信サーバーにリレーが許可されていない",
+    },
+    {
+        "category": "user_mailbox_full",
+        "status": ("5.2.2",),
+        "reason": "宛先メールボックスの容量超過",
+    },
+    {
+        "category": "user_unknown",
+        "status": ("5.1.1", "5.1.10"),
+        "reason": "宛先メールアドレスが存在しない",
+    },
+    {
+        "category": "user_unknown",
+        "status": ("5.1.2",),
+        "patterns": (r"host or domain name not found", r"domain not found", r"name service error"),
+        "reason": "宛先ドメインが存在しない",
+    },
+)
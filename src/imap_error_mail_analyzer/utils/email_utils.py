@@ -1,5 +1,6 @@
 """Email parsing utilities."""
 
+import email
 import hashlib
 import re
 
@@ -24,6 +25,27 @@ def decode_header_value(value):
     return " ".join(decoded_parts)
 
 
+def message_from_raw(raw, *, partial=False):
+    """Parse RFC822 bytes, keeping them on the message as ``raw_bytes``.
+
+    The email generator refolds headers and MIME boundaries when a parsed
+    message is serialised again, so the original bytes are kept for
+    callers that need them unchanged (see :func:`get_raw_bytes`).
+    *partial* is stored as ``msg.partial`` and marks bytes rebuilt from a
+    partial fetch, which are not the message as stored on the server.
+    """
+    msg = email.message_from_bytes(raw)
+    msg.raw_bytes = raw
+    msg.partial = partial
+    return msg
+
+
+def get_raw_bytes(msg):
+    """Return the bytes *msg* was parsed from, or its serialised form if they were not kept."""
+    raw = getattr(msg, "raw_bytes", None)
+    return raw if raw is not None else msg.as_bytes()
+
+
 def get_header(msg, name, default=""):
     """Get a decoded header value from an email message."""
     raw = msg.get(name, default)
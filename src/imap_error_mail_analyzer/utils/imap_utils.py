@@ -0,0 +1,317 @@
+"""IMAP protocol helpers for building commands and parsing responses."""
+
+import re
+
+# Start of an untagged FETCH response: ``* 12 FETCH (`` (imaplib strips ``* ``)
+_RE_FETCH_START = re.compile(rb"^(\d+) \(")
+# FETCH data item followed by a literal, e.g. ``RFC822 {1234}``
+_RE_LITERAL_ITEM = re.compile(rb"(RFC822(?:\.HEADER|\.TEXT)?|BODY\[[^\]]*\](?:<\d+>)?)\s*\{\d+\}$", re.IGNORECASE)
+_RE_LITERAL_MARKER = re.compile(rb"\{\d+\}$")
+_RE_UID = re.compile(rb"\bUID (\d+)", re.IGNORECASE)
+
+
+def format_uid_set(uids):
+    """Build a compact IMAP sequence set such as ``1:500,502,510:512``.
+
+    Parameters
+    ----------
+    uids : list[int]
+        UIDs in ascending order.
+    """
+    ranges = []
+    for uid in uids:
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(lo) if lo == hi else f"{lo}:{hi}" for lo, hi in ranges)
+
+
+def parse_fetch_response(data):
+    """Split a multi-message ``FETCH`` response from imaplib into per-message items.
+
+    imaplib returns a flat list where literals arrive as ``(header, bytes)``
+    tuples and the remaining text of a response as plain bytes.  Literals
+    belonging to body data items (``RFC822``, ``BODY[...]``) are collected
+    under their upper-cased item name; any other literal (e.g. a quoted
+    string inside ``BODYSTRUCTURE``) is folded back into the text so it can
+    be parsed later.
+
+    Returns
+    -------
+    list[dict]
+        ``{"uid": int | None, "text": bytes, "items": dict[str, bytes]}``
+        per message, in response order.
+    """
+    messages = []
+    current = None
+    for entry in data:
+        if entry is None:
+            continue
+        head, literal = entry if isinstance(entry, tuple) else (entry, None)
+        start = _RE_FETCH_START.match(head)
+        if start:
+            current = {"uid": None, "text": b"", "items": {}}
+            messages.append(current)
+            head = head[start.end() :]
+        if current is None:
+            continue
+
+        if literal is None:
+            current["text"] += head
+            continue
+
+        item_match = _RE_LITERAL_ITEM.search(head)
+        if item_match:
+            current["text"] += head[: item_match.start()]
+            name = item_match.group(1).upper().decode("ascii")
+            current["items"][re.sub(r"<\d+>$", "", name)] = literal
+        else:
+            marker = _RE_LITERAL_MARKER.search(head)
+            if not marker:
+                current["text"] += head
+                continue
+            quoted = literal.replace(b"\\", b"\\\\").replace(b'"', b'\\"')
+            current["text"] += head[: marker.start()] + b'"' + quoted + b'"'
+
+    for message in messages:
+        uid_match = _RE_UID.search(message["text"])
+        if uid_match:
+            message["uid"] = int(uid_match.group(1))
+    return messages
+
+
+def merge_fetch_items(messages, uids):
+    """Combine the parsed FETCH responses of each UID in *uids*.
+
+    A server may split the data items of one message over several
+    untagged FETCH responses, and unsolicited ones (e.g. a ``FLAGS``
+    update) can arrive while the command runs.  Responses of the same UID
+    are merged into one item whose ``text`` is the concatenated text and
+    whose ``items`` hold the body items of all of them.
+
+    Returns
+    -------
+    list[dict]
+        One item (see :func:`parse_fetch_response`) per fetched UID, in UID order.
+    """
+    wanted = set(uids)
+    merged = {}
+    for message in messages:
+        uid = message["uid"]
+        if uid not in wanted:
+            continue
+        if uid in merged:
+            merged[uid]["text"] += b" " + message["text"]
+            merged[uid]["items"].update(message["items"])
+        else:
+            merged[uid] = {"uid": uid, "text": message["text"], "items": dict(message["items"])}
+    return [merged[uid] for uid in sorted(merged)]
+
+
+# ---------------------------------------------------------------------------
+# BODYSTRUCTURE parsing and partial fetch
+# ---------------------------------------------------------------------------
+
+_RE_BODYSTRUCTURE = re.compile(rb"BODYSTRUCTURE \(", re.IGNORECASE)
+_RE_ATOM = re.compile(rb"[^\s()\"]+")
+
+# Leaf parts downloaded completely by a partial fetch (the parser needs them intact)
+_FULL_PARTS = {"message/delivery-status", "message/global-delivery-status"}
+
+
+def parse_bodystructure(fetch_text):
+    """Parse the ``BODYSTRUCTURE`` of a FETCH response into a part tree.
+
+    Each node is a dict with ``type`` (lower-case MIME type), ``section``
+    (IMAP section specifier, ``""`` for the top-level message),
+    ``is_body`` (True when the node is the body of a message rather than a
+    MIME part of a multipart), ``encoding``, ``size`` and, depending on the
+    type, ``boundary``/``children`` (multipart) or ``message`` (the body
+    node of an embedded ``message/rfc822``).
+
+    Returns None when the response contains no parsable BODYSTRUCTURE.
+    """
+    match = _RE_BODYSTRUCTURE.search(fetch_text)
+    if not match:
+        return None
+    try:
+        data, _ = _parse_sexp(fetch_text, match.end() - 1)
+        return _build_part(data, "", is_body=True)
+    except (IndexError, ValueError, TypeError):
+        return None
+
+
+def plan_partial_fetch(structure, max_bytes):
+    """Return the ``BODY.PEEK`` items needed to rebuild a size-capped copy of a message.
+
+    The plan covers the top-level header, the MIME headers of every kept
+    part, text parts (capped at *max_bytes* with a ``<0.N>`` partial range),
+    delivery-status parts in full and the header of each embedded
+    ``message/rfc822``.  Attachments and other non-text parts are left out.
+    """
+    items = ["BODY.PEEK[HEADER]"]
+    _plan_body(structure, max_bytes, items)
+    return items
+
+
+def assemble_partial_message(structure, sections):
+    """Rebuild raw RFC 822 bytes from the sections fetched for a partial plan.
+
+    Parameters
+    ----------
+    structure : dict
+        Part tree from :func:`parse_bodystructure`.
+    sections : dict[str, bytes]
+        Body items of the FETCH response keyed by name (``BODY[1.MIME]``).
+
+    Returns
+    -------
+    bytes or None
+        None if a required section is missing and the message must be
+        fetched in full instead.
+    """
+    header = sections.get("BODY[HEADER]")
+    if header is None:
+        return None
+    body = _assemble_body(structure, sections)
+    if body is None:
+        return None
+    return header + body
+
+
+def _parse_sexp(text, pos):
+    """Parse one parenthesised list or atom starting at *pos*; return ``(value, next_pos)``."""
+    while text[pos : pos + 1].isspace():
+        pos += 1
+    char = text[pos : pos + 1]
+    if char == b"(":
+        values = []
+        pos += 1
+        while True:
+            while text[pos : pos + 1].isspace():
+                pos += 1
+            if text[pos : pos + 1] == b")":
+                return values, pos + 1
+            if pos >= len(text):
+                raise ValueError("Unterminated list in BODYSTRUCTURE")
+            value, pos = _parse_sexp(text, pos)
+            values.append(value)
+    if char == b'"':
+        out = bytearray()
+        pos += 1
+        while text[pos : pos + 1] != b'"':
+            if text[pos : pos + 1] == b"\\":
+                pos += 1
+            out += text[pos : pos + 1]
+            pos += 1
+        return out.decode("utf-8", errors="replace"), pos + 1
+    atom = _RE_ATOM.match(text, pos)
+    if not atom:
+        raise ValueError("Unexpected token in BODYSTRUCTURE")
+    value = atom.group(0).decode("ascii", errors="replace")
+    return (None if value.upper() == "NIL" else value), atom.end()
+
+
+def _build_part(data, section, is_body):
+    """Convert a parsed BODYSTRUCTURE list into a part tree node."""
+    if isinstance(data[0], list):
+        count = 0
+        while isinstance(data[count], list):
+            count += 1
+        params = _param_dict(data[count + 1] if len(data) > count + 1 else None)
+        children = [_build_part(child, f"{section}.{n}" if section else str(n), is_body=False) for n, child in enumerate(data[:count], 1)]
+        return {
+            "type": f"multipart/{data[count]}".lower(),
+            "section": section,
+            "is_body": is_body,
+            "boundary": params.get("boundary"),
+            "children": children,
+        }
+
+    node = {
+        "type": f"{data[0]}/{data[1]}".lower(),
+        "section": section,
+        "is_body": is_body,
+        "encoding": (data[5] or "7bit").lower(),
+        "size": int(data[6] or 0),
+    }
+    if node["type"] == "message/rfc822" and len(data) > 8 and isinstance(data[8], list):
+        node["message"] = _build_part(data[8], section, is_body=True)
+    return node
+
+
+def _param_dict(params):
+    """Convert a BODYSTRUCTURE parameter list into a lower-cased key dict."""
+    if not isinstance(params, list):
+        return {}
+    return {str(params[i]).lower(): params[i + 1] for i in range(0, len(params) - 1, 2)}
+
+
+def _text_key(node):
+    """Return the section specifier holding the content of *node*."""
+    if node["is_body"]:
+        return f"{node['section']}.TEXT" if node["section"] else "TEXT"
+    return node["section"]
+
+
+def _plan_body(node, max_bytes, items):
+    """Append the fetch items for the content of *node* (headers excluded)."""
+    if node["type"].startswith("multipart/"):
+        for child in node["children"]:
+            _plan_part(child, max_bytes, items)
+    elif node["type"].startswith("text/"):
+        limit = f"<0.{max_bytes}>" if node["size"] > max_bytes else ""
+        items.append(f"BODY.PEEK[{_text_key(node)}]{limit}")
+    elif node["type"] in _FULL_PARTS:
+        items.append(f"BODY.PEEK[{_text_key(node)}]")
+
+
+def _plan_part(node, max_bytes, items):
+    """Append the fetch items for a MIME part inside a multipart."""
+    part_type = node["type"]
+    if part_type == "message/rfc822" and "message" in node:
+        items.append(f"BODY.PEEK[{node['section']}.MIME]")
+        items.append(f"BODY.PEEK[{node['section']}.HEADER]")
+        _plan_body(node["message"], max_bytes, items)
+    elif part_type.startswith(("multipart/", "text/")) or part_type in _FULL_PARTS:
+        items.append(f"BODY.PEEK[{node['section']}.MIME]")
+        _plan_body(node, max_bytes, items)
+
+
+def _assemble_body(node, sections):
+    """Return the content bytes of *node* (without its own header), or None if incomplete."""
+    if node["type"].startswith("multipart/"):
+        boundary = node.get("boundary")
+        if not boundary:
+            return None
+        delimiter = b"--" + boundary.encode("ascii", errors="replace")
+        out = b""
+        for child in node["children"]:
+            part = _assemble_part(child, sections)
+            if part:
+                out += delimiter + b"\r\n" + part + b"\r\n"
+        return out + delimiter + b"--\r\n"
+
+    content = sections.get(f"BODY[{_text_key(node).upper()}]")
+    if content is None:
+        return b""
+    if node["encoding"] == "base64" and len(content) < node["size"]:
+        # A capped base64 part must end on a whole line to stay decodable
+        content = content[: content.rfind(b"\n") + 1]
+    return content
+
+
+def _assemble_part(node, sections):
+    """Return MIME header plus content of a multipart child, or None when it was not fetched."""
+    mime = sections.get(f"BODY[{node['section']}.MIME]")
+    if mime is None:
+        return None
+    if node["type"] == "message/rfc822" and "message" in node:
+        header = sections.get(f"BODY[{node['section']}.HEADER]")
+        body = _assemble_body(node["message"], sections)
+        if header is None or body is None:
+            return None
+        return mime + header + body
+    body = _assemble_body(node, sections)
+    return None if body is None else mime + body
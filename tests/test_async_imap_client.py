@@ -0,0 +1,256 @@
+"""Tests for AsyncImapClient against a scripted IMAP server."""
+
+import asyncio
+import re
+import socketserver
+import threading
+import time
+import zlib
+
+import pytest
+
+from imap_error_mail_analyzer.modules.async_imap_client import AsyncImapClient
+from imap_error_mail_analyzer.modules.config import AccountConfig
+
+_PLAIN = b"""From: friend@example.org
+To: sender@example.com
+Subject: Lunch
+Message-ID: <plain@example.org>
+Content-Type: text/plain
+
+See you at noon.
+""".replace(
+    b"\n", b"\r\n"
+)
+
+_BOUNCE = b"""From: MAILER-DAEMON@mx.example.com
+To: sender@example.com
+Subject: Undelivered Mail
+Message-ID: <bounce@mx>
+MIME-Version: 1.0
+Content-Type: multipart/report; report-type=delivery-status; boundary="b1"
+
+--b1
+Content-Type: text/plain
+
+Delivery failed for user@example.org.
+
+--b1
+Content-Type: message/delivery-status
+
+Reporting-MTA: dns; mx.example.com
+
+Final-Recipient: rfc822; user@example.org
+Action: failed
+Status: 5.1.1
+
+--b1--
+""".replace(
+    b"\n", b"\r\n"
+)
+
+# UID -> raw message
+_MAILBOX = {3: _PLAIN, 7: _BOUNCE}
+
+_RE_UID_FETCH = re.compile(rb"^UID FETCH ([\d:,]+) (.*)$", re.IGNORECASE)
+
+
+def _parse_uid_set(text):
+    uids = set()
+    for part in text.decode("ascii").split(","):
+        first, _, last = part.partition(":")
+        uids.update(range(int(first), int(last or first) + 1))
+    return sorted(uids)
+
+
+def _fetch_response(seq, uid, items):
+    """Build an untagged FETCH response for *uid*; each header/body is sent as a literal."""
+    raw = _MAILBOX[uid]
+    header = raw.split(b"\r\n\r\n", 1)[0]
+    if b"RFC822.SIZE" in items:
+        fields = b"\r\n".join(line for line in header.split(b"\r\n") if line.split(b":")[0].upper() in (b"MESSAGE-ID", b"CONTENT-TYPE", b"FROM"))
+        fields += b"\r\n\r\n"
+        return (
+            b"* %d FETCH (UID %d RFC822.SIZE %d " % (seq, uid, len(raw))
+            + b'BODYSTRUCTURE ("TEXT" "PLAIN" NIL NIL NIL "7BIT" 20 1 NIL NIL NIL NIL) '
+            + b"BODY[HEADER.FIELDS (MESSAGE-ID CONTENT-TYPE FROM)] {%d}\r\n%s)\r\n" % (len(fields), fields)
+        )
+    return b"* %d FETCH (UID %d RFC822 {%d}\r\n%s)\r\n" % (seq, uid, len(raw), raw)
+
+
+class _ScriptedHandler(socketserver.StreamRequestHandler):
+    """Serves ``_MAILBOX`` as INBOX; IDLE replies with ``server.idle_reply`` or drops the connection if it is None."""
+
+    def setup(self):
+        super().setup()
+        self.compressor = None
+        self.inflater = None
+        self.pending = b""
+
+    def send(self, data):
+        if self.compressor:
+            data = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.wfile.write(data)
+
+    def readline(self):
+        while b"\n" not in self.pending:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return b""
+            self.pending += self.inflater.decompress(chunk) if self.inflater else chunk
+        line, _, self.pending = self.pending.partition(b"\n")
+        return line.rstrip(b"\r")
+
+    def handle(self):
+        capabilities = "IMAP4rev1 IDLE" + (" COMPRESS=DEFLATE" if self.server.compress else "")
+        self.send(b"* OK ready\r\n")
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            tag, _, command = line.partition(b" ")
+            self.server.commands.append(command)
+            verb = command.split(b" ", 1)[0].upper()
+            if verb == b"CAPABILITY":
+                self.send(f"* CAPABILITY {capabilities}\r\n".encode() + tag + b" OK done\r\n")
+            elif verb == b"COMPRESS":
+                self.send(tag + b" OK DEFLATE active\r\n")
+                self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+                self.inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+            elif verb == b"EXAMINE":
+                self.send(b"* %d EXISTS\r\n* OK [UIDVALIDITY 1] UIDs valid\r\n" % len(_MAILBOX) + tag + b" OK [READ-ONLY] done\r\n")
+            elif command.upper().startswith(b"UID SEARCH"):
+                self.send(b"* SEARCH " + b" ".join(b"%d" % uid for uid in _MAILBOX) + b"\r\n" + tag + b" OK done\r\n")
+            elif _RE_UID_FETCH.match(command):
+                uid_set, items = _RE_UID_FETCH.match(command).groups()
+                for seq, uid in enumerate(_MAILBOX, 1):
+                    if uid in _parse_uid_set(uid_set):
+                        self.send(_fetch_response(seq, uid, items))
+                self.send(tag + b" OK done\r\n")
+            elif verb == b"IDLE":
+                if self.server.idle_reply is None:
+                    self.send(b"+ idling\r\n")
+                    time.sleep(0.2)
+                    return
+                # Continuation and untagged responses in a single write
+                self.send(b"+ idling\r\n" + self.server.idle_reply)
+                if self.readline().upper() != b"DONE":
+                    return
+                self.send(tag + b" OK IDLE terminated\r\n")
+            elif verb == b"LOGOUT":
+                self.send(b"* BYE\r\n" + tag + b" OK done\r\n")
+                return
+            elif verb == b"LOGIN":
+                self.send(tag + b" OK logged in\r\n")
+            else:
+                self.send(tag + b" BAD unsupported\r\n")
+
+
+@pytest.fixture(name="imap_server")
+def fixture_imap_server():
+    """Start a scripted IMAP server; ``commands`` collects the commands received."""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _ScriptedHandler)
+    server.daemon_threads = True
+    server.compress = False
+    server.idle_reply = b""
+    server.commands = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _run(server, session, **settings):
+    """Connect with *settings* applied to the account, await ``session(client)`` and disconnect."""
+    account = AccountConfig(
+        name="test",
+        host="127.0.0.1",
+        port=server.server_address[1],
+        username="user",
+        password="secret",
+        security="none",
+        incremental_sync=False,
+        compress=server.compress,
+        **settings,
+    )
+
+    async def main():
+        client = AsyncImapClient(account)
+        await client.connect()
+        try:
+            return await session(client)
+        finally:
+            await client.disconnect()
+
+    return asyncio.run(main())
+
+
+async def _subjects(client):
+    return [msg["Subject"] async for msg in client.fetch_messages("INBOX", 7)]
+
+
+def _fetch_commands(server):
+    return [command for command in server.commands if command.upper().startswith(b"UID FETCH")]
+
+
+def test_fetch_messages_downloads_only_bounce_candidates(imap_server):
+    assert _run(imap_server, _subjects) == ["Undelivered Mail"]
+
+    prefetch, download = _fetch_commands(imap_server)
+    assert prefetch.startswith(b"UID FETCH 3,7 (UID RFC822.SIZE BODYSTRUCTURE")
+    assert download == b"UID FETCH 7 (RFC822)"
+
+
+def test_fetch_messages_without_prefilter_downloads_everything(imap_server):
+    assert _run(imap_server, _subjects, prefilter=False) == ["Lunch", "Undelivered Mail"]
+
+    assert _fetch_commands(imap_server) == [b"UID FETCH 3,7 (RFC822)"]
+
+
+def test_fetch_messages_skips_known_hashes_in_prefilter(imap_server):
+    async def session(client):
+        return [msg async for msg in client.fetch_messages("INBOX", 7, skip_hash=lambda _: True)]
+
+    assert _run(imap_server, session) == []
+    assert len(_fetch_commands(imap_server)) == 1
+
+
+def test_fetch_messages_over_compressed_stream(imap_server):
+    imap_server.compress = True
+
+    assert _run(imap_server, _subjects, fetch_batch_size=1) == ["Undelivered Mail"]
+
+    assert b"COMPRESS DEFLATE" in imap_server.commands
+    assert len(_fetch_commands(imap_server)) == 3
+
+
+def test_idle_reports_exists_sent_with_continuation(imap_server):
+    imap_server.idle_reply = b"* 3 EXISTS\r\n"
+
+    async def session(client):
+        start = time.monotonic()
+        assert await client.wait_for_changes(5) is True
+        return time.monotonic() - start
+
+    assert _run(imap_server, session) < 1
+
+
+def test_idle_times_out_without_new_mail(imap_server):
+    async def session(client):
+        start = time.monotonic()
+        assert await client.wait_for_changes(0.5) is False
+        return time.monotonic() - start
+
+    assert 0.4 < _run(imap_server, session) < 2
+
+
+def test_idle_raises_promptly_when_connection_drops(imap_server):
+    imap_server.idle_reply = None
+
+    async def session(client):
+        start = time.monotonic()
+        with pytest.raises(ConnectionError):
+            await client.wait_for_changes(10)
+        return time.monotonic() - start
+
+    assert _run(imap_server, session) < 2
@@ -0,0 +1,55 @@
+"""Tests for configuration loading and validation."""
+
+import json
+
+import pytest
+
+from imap_error_mail_analyzer.modules.config import load_config
+
+
+def _write_config(tmp_path, top=None, account=None):
+    raw = {
+        "accounts": {"acc": {"host": "imap.example.com", "port": 993, "username": "user", "password": "secret", **(account or {})}},
+        **(top or {}),
+    }
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(raw), encoding="utf-8")
+    return path
+
+
+def test_load_config_defaults(tmp_path):
+    config = load_config(_write_config(tmp_path))
+
+    assert config.concurrency == 1
+    assert config.accounts["acc"].max_connections == 1
+    assert config.accounts["acc"].partial_fetch_bytes == 0
+
+
+def test_load_config_accepts_zero_partial_fetch_bytes(tmp_path):
+    config = load_config(_write_config(tmp_path, top={"concurrency": 4}, account={"partial_fetch_bytes": 0, "fetch_batch_size": 50}))
+
+    assert config.concurrency == 4
+    assert config.accounts["acc"].fetch_batch_size == 50
+
+
+@pytest.mark.parametrize(
+    ("top", "account"),
+    [
+        ({"concurrency": "4"}, None),
+        ({"concurrency": 0.5}, None),
+        ({"concurrency": 0}, None),
+        ({"concurrency": True}, None),
+        ({"ollama": {"concurrency": 0}}, None),
+        ({"ollama": {"batch_size": "8"}}, None),
+        ({"ollama": {"endpoints": [{"base_url": "http://a:11434", "max_concurrency": 0}]}}, None),
+        (None, {"max_connections": 0}),
+        (None, {"fetch_batch_size": 2.5}),
+        (None, {"partial_fetch_bytes": -1}),
+        (None, {"partial_fetch_bytes": "16384"}),
+    ],
+)
+def test_load_config_rejects_invalid_integers(tmp_path, top, account):
+    with pytest.raises(SystemExit) as exc_info:
+        load_config(_write_config(tmp_path, top=top, account=account))
+
+    assert exc_info.value.code == 1
@@ -0,0 +1,131 @@
+"""Tests for the IDLE handling of ImapClient against a scripted IMAP server."""
+
+import socket
+import socketserver
+import threading
+import time
+import zlib
+
+import pytest
+
+from imap_error_mail_analyzer.modules.config import AccountConfig
+from imap_error_mail_analyzer.modules.imap_client import ImapClient
+
+
+class _ScriptedHandler(socketserver.StreamRequestHandler):
+    """Answers LOGIN, CAPABILITY, COMPRESS, IDLE and LOGOUT; IDLE replies with ``server.idle_reply``."""
+
+    def setup(self):
+        super().setup()
+        self.compressor = None
+        self.inflater = None
+        self.pending = b""
+
+    def send(self, data):
+        if self.compressor:
+            data = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.wfile.write(data)
+
+    def readline(self):
+        while b"\n" not in self.pending:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return b""
+            self.pending += self.inflater.decompress(chunk) if self.inflater else chunk
+        line, _, self.pending = self.pending.partition(b"\n")
+        return line.rstrip(b"\r")
+
+    def handle(self):
+        capabilities = "IMAP4rev1 IDLE" + (" COMPRESS=DEFLATE" if self.server.compress else "")
+        self.send(b"* OK ready\r\n")
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            tag, command = line.split(b" ", 2)[:2]
+            command = command.upper()
+            if command == b"CAPABILITY":
+                self.send(f"* CAPABILITY {capabilities}\r\n".encode() + tag + b" OK done\r\n")
+            elif command == b"COMPRESS":
+                self.send(tag + b" OK DEFLATE active\r\n")
+                self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+                self.inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+            elif command == b"IDLE":
+                # Continuation and untagged responses in a single write
+                self.send(b"+ idling\r\n" + self.server.idle_reply)
+                if self.readline().upper() != b"DONE":
+                    return
+                self.send(tag + b" OK IDLE terminated\r\n")
+            elif command == b"LOGOUT":
+                self.send(b"* BYE\r\n" + tag + b" OK done\r\n")
+                return
+            elif command == b"LOGIN":
+                self.send(tag + b" OK logged in\r\n")
+            else:
+                self.send(tag + b" BAD unsupported\r\n")
+
+
+@pytest.fixture(name="imap_server")
+def fixture_imap_server():
+    """Start a scripted IMAP server; tests set ``compress`` and ``idle_reply`` before connecting."""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _ScriptedHandler)
+    server.daemon_threads = True
+    server.compress = False
+    server.idle_reply = b""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _connect(server):
+    account = AccountConfig(
+        name="test",
+        host="127.0.0.1",
+        port=server.server_address[1],
+        username="user",
+        password="secret",
+        security="none",
+        incremental_sync=False,
+        compress=server.compress,
+    )
+    client = ImapClient(account)
+    client.connect()
+    return client
+
+
+def test_idle_reports_exists_sent_with_continuation(imap_server):
+    imap_server.idle_reply = b"* 3 EXISTS\r\n"
+    client = _connect(imap_server)
+    try:
+        start = time.monotonic()
+        assert client.wait_for_changes(5) is True
+        assert time.monotonic() - start < 1
+    finally:
+        client.disconnect()
+
+
+def test_idle_times_out_without_new_mail(imap_server):
+    client = _connect(imap_server)
+    try:
+        start = time.monotonic()
+        assert client.wait_for_changes(0.5) is False
+        assert 0.4 < time.monotonic() - start < 2
+        assert client.supports_idle
+        assert client._conn.sock.gettimeout() == socket.getdefaulttimeout()  # pylint: disable=protected-access
+    finally:
+        client.disconnect()
+
+
+def test_idle_reports_exists_inflated_with_continuation(imap_server):
+    imap_server.compress = True
+    imap_server.idle_reply = b"* 3 EXISTS\r\n"
+    client = _connect(imap_server)
+    try:
+        start = time.monotonic()
+        assert client.wait_for_changes(5) is True
+        assert time.monotonic() - start < 1
+        imap_server.idle_reply = b""
+        assert client.wait_for_changes(0.5) is False
+    finally:
+        client.disconnect()
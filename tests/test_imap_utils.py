@@ -0,0 +1,154 @@
+"""Tests for the IMAP response parsing and partial fetch helpers."""
+
+import base64
+import email
+
+import pytest
+
+from imap_error_mail_analyzer.modules.imap_client import _assemble_partials
+from imap_error_mail_analyzer.utils.imap_utils import (
+    assemble_partial_message,
+    format_uid_set,
+    merge_fetch_items,
+    parse_bodystructure,
+    parse_fetch_response,
+    plan_partial_fetch,
+)
+
+# multipart/report: notification text, delivery-status and the returned message with a base64 body
+_BODYSTRUCTURE = (
+    b'BODYSTRUCTURE (("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 40 2 NIL NIL NIL NIL)'
+    b'("MESSAGE" "DELIVERY-STATUS" NIL NIL NIL "7BIT" 120 NIL NIL NIL NIL)'
+    b'("MESSAGE" "RFC822" NIL NIL NIL "7BIT" 3000 ("date" "subject" NIL NIL NIL NIL NIL NIL NIL "<id@x>")'
+    b' ("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "BASE64" 2800 36 NIL NIL NIL NIL) 60 NIL NIL NIL NIL)'
+    b' "REPORT" ("REPORT-TYPE" "delivery-status" "BOUNDARY" "b1") NIL NIL NIL)'
+)
+
+
+@pytest.mark.parametrize(
+    ("uids", "expected"),
+    [([1], "1"), ([1, 2, 3, 5], "1:3,5"), ([2, 4, 5, 6, 9, 10], "2,4:6,9:10")],
+)
+def test_format_uid_set(uids, expected):
+    assert format_uid_set(uids) == expected
+
+
+def test_parse_fetch_response_collects_literals_per_message():
+    data = [
+        (b"1 (UID 7 RFC822.SIZE 120 BODY[HEADER] {9}", b"Subject:\r\n"),
+        (b" BODY[1]<0> {5}", b"hello"),
+        b")",
+        (b'2 (UID 9 BODYSTRUCTURE ("TEXT" "PLAIN" NIL NIL {3}', b"a\"b"),
+        b' "7BIT" 3 1 NIL NIL NIL NIL))',
+    ]
+
+    first, second = parse_fetch_response(data)
+
+    assert first["uid"] == 7
+    assert first["items"] == {"BODY[HEADER]": b"Subject:\r\n", "BODY[1]": b"hello"}
+    assert b"RFC822.SIZE 120" in first["text"]
+    assert second["uid"] == 9
+    assert second["items"] == {}
+    # A literal inside BODYSTRUCTURE is folded back in as a quoted string
+    assert b'NIL "a\\"b" "7BIT"' in second["text"]
+
+
+def test_merge_fetch_items_combines_split_and_unsolicited_responses():
+    data = [
+        (b"1 (UID 7 BODY[HEADER] {9}", b"Subject:\r\n"),
+        b")",
+        b"3 (FLAGS (\\Seen))",
+        (b"1 (UID 7 BODY[1] {5}", b"hello"),
+        b")",
+        b"1 (FLAGS (\\Seen) UID 7)",
+        (b"2 (UID 8 BODY[HEADER] {9}", b"Subject:\r\n"),
+        b")",
+    ]
+
+    merged = merge_fetch_items(parse_fetch_response(data), [7])
+
+    assert len(merged) == 1
+    assert merged[0]["uid"] == 7
+    assert merged[0]["items"] == {"BODY[HEADER]": b"Subject:\r\n", "BODY[1]": b"hello"}
+    assert b"FLAGS" in merged[0]["text"]
+
+
+def test_parse_bodystructure_builds_part_tree():
+    structure = parse_bodystructure(b"UID 7 " + _BODYSTRUCTURE)
+
+    assert structure["type"] == "multipart/report"
+    assert structure["boundary"] == "b1"
+    text, status, returned = structure["children"]
+    assert (text["type"], text["section"], text["size"]) == ("text/plain", "1", 40)
+    assert status["type"] == "message/delivery-status"
+    assert returned["type"] == "message/rfc822"
+    assert returned["message"] == {"type": "text/plain", "section": "3", "is_body": True, "encoding": "base64", "size": 2800}
+
+
+def test_parse_bodystructure_rejects_missing_or_broken_structure():
+    assert parse_bodystructure(b"UID 7 RFC822.SIZE 10") is None
+    assert parse_bodystructure(b'BODYSTRUCTURE (("TEXT" "PLAIN"') is None
+
+
+def test_plan_partial_fetch_caps_text_parts():
+    items = plan_partial_fetch(parse_bodystructure(_BODYSTRUCTURE), 1000)
+
+    assert items == [
+        "BODY.PEEK[HEADER]",
+        "BODY.PEEK[1.MIME]",
+        "BODY.PEEK[1]",
+        "BODY.PEEK[2.MIME]",
+        "BODY.PEEK[2]",
+        "BODY.PEEK[3.MIME]",
+        "BODY.PEEK[3.HEADER]",
+        "BODY.PEEK[3.TEXT]<0.1000>",
+    ]
+
+
+def _sections():
+    body = base64.encodebytes(b"original message text " * 100)
+    return {
+        "BODY[HEADER]": b'Subject: Undelivered\r\nContent-Type: multipart/report; report-type=delivery-status; boundary="b1"\r\n\r\n',
+        "BODY[1.MIME]": b"Content-Type: text/plain\r\n\r\n",
+        "BODY[1]": b"Delivery failed.\r\n",
+        "BODY[2.MIME]": b"Content-Type: message/delivery-status\r\n\r\n",
+        "BODY[2]": b"Reporting-MTA: dns; mx.example.com\r\n\r\nFinal-Recipient: rfc822; user@example.org\r\nStatus: 5.1.1\r\n",
+        "BODY[3.MIME]": b"Content-Type: message/rfc822\r\n\r\n",
+        "BODY[3.HEADER]": b"Subject: hello\r\nContent-Type: text/plain\r\nContent-Transfer-Encoding: base64\r\n\r\n",
+        # Capped in the middle of a line
+        "BODY[3.TEXT]": body[:1000],
+    }
+
+
+def test_assemble_partial_message_rebuilds_parsable_message():
+    raw = assemble_partial_message(parse_bodystructure(_BODYSTRUCTURE), _sections())
+
+    msg = email.message_from_bytes(raw)
+    text, status, returned = msg.get_payload()
+    assert msg.get_content_type() == "multipart/report"
+    assert text.get_payload() == "Delivery failed.\r\n"
+    assert status.get_content_type() == "message/delivery-status"
+    inner = returned.get_payload()[0]
+    assert inner["Subject"] == "hello"
+    # The base64 body was cut back to whole lines and still decodes
+    assert inner.get_payload(decode=True).startswith(b"original message text")
+
+
+def test_assemble_partial_message_requires_header():
+    sections = _sections()
+    del sections["BODY[HEADER]"]
+
+    assert assemble_partial_message(parse_bodystructure(_BODYSTRUCTURE), sections) is None
+
+
+def test_assemble_partials_tolerates_split_fetch_responses():
+    structure = parse_bodystructure(_BODYSTRUCTURE)
+    sections = _sections()
+    data = [(f"1 (UID 7 {name} {{{len(value)}}}".encode("ascii"), value) for name, value in sections.items()]
+    data += [b")", b"1 (FLAGS (\\Seen) UID 7)"]
+
+    rebuilt, retry = _assemble_partials({7: structure, 8: structure}, merge_fetch_items(parse_fetch_response(data), [7, 8]))
+
+    assert [uid for uid, _, _ in rebuilt] == [7]
+    assert rebuilt[0][2] is True
+    assert retry == [8]
@@ -0,0 +1,160 @@
+"""Tests for OllamaClient against a local stand-in for the Ollama HTTP API."""
+
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from imap_error_mail_analyzer.modules.bounce_parser import BounceRecord
+from imap_error_mail_analyzer.modules.ollama_client import OllamaClient
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    """Answers ``/api/tags`` and ``/api/generate``; generate replies with ``server.reply``."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self._send_json({"models": [{"name": "test-model"}]})
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        self.server.requests.append(request)
+        final = {"response": "", "done": True, "prompt_eval_count": 10, "prompt_eval_duration": 2000000, "eval_count": 5}
+        if not request.get("stream"):
+            self._send_json({**final, "response": self.server.reply})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in ({"response": self.server.reply, "done": False}, final):
+                line = json.dumps(chunk).encode("utf-8") + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+                time.sleep(0.2)
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass  # client closed the stream once the answer was complete
+
+
+@pytest.fixture(name="ollama_server")
+def fixture_ollama_server():
+    """Start the stand-in server; ``requests`` collects the generate payloads."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaHandler)
+    server.requests = []
+    server.reply = "[1]\nCATEGORY: user_unknown\nREASON: unknown recipient\n"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _bounce(to_addr, message="550 5.1.1 Recipient address rejected: User unknown"):
+    return BounceRecord(
+        date="2026-02-10T12:34:56+09:00",
+        error_code="550",
+        error_message=message,
+        from_addr="sender@example.com",
+        to_addr=to_addr,
+        subject="Undelivered Mail",
+        body_plain="",
+        body_html="",
+        body_plain_original="",
+        body_html_original="",
+        delivery_status={},
+        folder="INBOX",
+    )
+
+
+def _client(server, **kwargs):
+    return OllamaClient(f"http://127.0.0.1:{server.server_address[1]}", "test-model", **kwargs)
+
+
+def test_sequential_duplicates_are_classified_once(ollama_server):
+    client = _client(ollama_server)
+    try:
+        results = [client.classify_error(_bounce(f"user{i}@example.org")) for i in range(8)]
+    finally:
+        client.close()
+
+    assert len(ollama_server.requests) == 1
+    assert {result["responsible"] for result in results} == {"user_unknown"}
+
+
+def test_queued_duplicates_are_classified_once(ollama_server):
+    client = _client(ollama_server, concurrency=1)
+    try:
+        futures = [client.submit(_bounce(f"user{i}@example.org")) for i in range(8)]
+        futures.append(client.submit(_bounce("other@example.org", message="550 5.7.1 Service unavailable; client host blocked")))
+        results = [future.result() for future in futures]
+    finally:
+        client.close()
+
+    assert len(ollama_server.requests) == 2
+    assert len(results) == 9
+
+
+def test_fallback_results_are_not_reused(ollama_server):
+    ollama_server.reply = "I cannot tell."
+    client = _client(ollama_server)
+    try:
+        results = [client.classify_error(_bounce(f"user{i}@example.org")) for i in range(2)]
+    finally:
+        client.close()
+
+    assert [result["classified_by"] for result in results] == ["fallback", "fallback"]
+    assert len(ollama_server.requests) == 2
+
+
+def test_log_stats_averages_reported_token_counts(ollama_server, caplog):
+    client = _client(ollama_server)
+    try:
+        client.classify_error(_bounce("user@example.org"))
+        with caplog.at_level(logging.INFO):
+            client.log_stats()
+    finally:
+        client.close()
+
+    assert "over 1 response(s) with counts (0 without): 10 prompt-eval token(s)" in caplog.text
+
+
+def test_log_stats_reports_streams_closed_early(ollama_server, caplog):
+    client = _client(ollama_server, stream=True)
+    try:
+        assert client.classify_error(_bounce("user@example.org"))["responsible"] == "user_unknown"
+        with caplog.at_level(logging.INFO):
+            client.log_stats()
+    finally:
+        client.close()
+
+    assert "1 request(s) (1 stopped early)" in caplog.text
+    assert "no response reported counts" in caplog.text
+
+
+def test_memo_is_cleared_when_the_pass_ends(ollama_server):
+    client = _client(ollama_server)
+    try:
+        client.classify_error(_bounce("user1@example.org"))
+        client.classify_error(_bounce("user2@example.org"))
+        client.save_cache()
+        client.classify_error(_bounce("user3@example.org"))
+    finally:
+        client.close()
+
+    assert len(ollama_server.requests) == 2
@@ -0,0 +1,136 @@
+"""Tests for EndpointBalancer with a fake probe and clock."""
+
+import threading
+import types
+
+import pytest
+
+from imap_error_mail_analyzer.modules import ollama_endpoints
+from imap_error_mail_analyzer.modules.ollama_endpoints import EndpointBalancer, OllamaEndpoint
+
+
+class _Probe:
+    """Records the probed endpoints and answers with ``ok``."""
+
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.calls = []
+
+    def __call__(self, endpoint):
+        self.calls.append(endpoint.base_url)
+        return self.ok
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    """Replace the monotonic clock of the balancer; advance it by setting ``clock.now``."""
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(ollama_endpoints, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def _balancer(*endpoints, probe=None):
+    return EndpointBalancer(endpoints, probe or _Probe())
+
+
+def test_acquire_picks_least_loaded_by_weight():
+    light = OllamaEndpoint("http://a", weight=1, max_concurrency=4)
+    heavy = OllamaEndpoint("http://b/", weight=2, max_concurrency=4)
+    balancer = _balancer(light, heavy)
+
+    picked = [balancer.acquire().base_url for _ in range(5)]
+
+    assert picked == ["http://b", "http://a", "http://b", "http://b", "http://a"]
+    assert (light.active, heavy.active) == (2, 3)
+
+
+def test_acquire_waits_for_a_free_slot():
+    endpoint = OllamaEndpoint("http://a")
+    balancer = _balancer(endpoint)
+    assert balancer.acquire() is endpoint
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(balancer.acquire()))
+    waiter.start()
+
+    waiter.join(0.2)
+    assert not acquired
+
+    balancer.release(endpoint, True)
+    waiter.join(2)
+    assert acquired == [endpoint]
+
+
+def test_acquire_skips_excluded_endpoints():
+    first = OllamaEndpoint("http://a", max_concurrency=2)
+    second = OllamaEndpoint("http://b", max_concurrency=2)
+    balancer = _balancer(first, second)
+
+    assert balancer.acquire(exclude=(first,)) is second
+    assert balancer.acquire(exclude=(first, second)) is None
+
+
+def test_failed_endpoint_leaves_rotation(clock):
+    first = OllamaEndpoint("http://a", max_concurrency=2)
+    second = OllamaEndpoint("http://b", max_concurrency=2)
+    probe = _Probe()
+    balancer = _balancer(first, second, probe=probe)
+
+    balancer.release(balancer.acquire(), False)
+
+    assert not first.healthy
+    assert first.retry_at == clock.now + 15
+    assert [balancer.acquire() for _ in range(2)] == [second, second]
+    assert not probe.calls
+
+
+def test_unhealthy_fallback_uses_earliest_retry(clock):
+    first = OllamaEndpoint("http://a", max_concurrency=2)
+    second = OllamaEndpoint("http://b", max_concurrency=2)
+    balancer = _balancer(first, second)
+    balancer.release(balancer.acquire(exclude=(second,)), False)
+    balancer.release(balancer.acquire(exclude=(second,)), False)
+    clock.now += 1
+    balancer.release(balancer.acquire(), False)
+
+    # first retries at +30 after two failures, second at +16
+    assert balancer.acquire() is second
+    assert balancer.acquire(exclude=(second,)) is first
+
+
+def test_probe_backoff_doubles_up_to_limit(clock):
+    endpoint = OllamaEndpoint("http://a")
+    other = OllamaEndpoint("http://b")
+    probe = _Probe(ok=False)
+    balancer = _balancer(endpoint, other, probe=probe)
+    balancer.release(balancer.acquire(), False)
+
+    delays = []
+    for _ in range(6):
+        clock.now = endpoint.retry_at
+        balancer.release(balancer.acquire(), True)
+        delays.append(endpoint.retry_at - clock.now)
+
+    assert delays == [30, 60, 120, 240, 300, 300]
+    assert probe.calls == ["http://a"] * 6
+    assert not endpoint.healthy
+
+
+def test_successful_probe_restores_endpoint(clock):
+    endpoint = OllamaEndpoint("http://a")
+    other = OllamaEndpoint("http://b")
+    probe = _Probe()
+    balancer = _balancer(endpoint, other, probe=probe)
+    balancer.release(balancer.acquire(), False)
+
+    clock.now += 10
+    assert balancer.acquire() is other
+    assert not probe.calls
+
+    clock.now += 5
+    balancer.release(other, True)
+    assert balancer.acquire(exclude=(endpoint,)) is other
+    assert not probe.calls
+    assert balancer.acquire() is endpoint
+    assert probe.calls == ["http://a"]
+    assert endpoint.healthy
+    assert endpoint.failures == 0
@@ -0,0 +1,97 @@
+"""Tests for FolderScan record collection and archiving."""
+
+from imap_error_mail_analyzer.modules.archive import RawArchive
+from imap_error_mail_analyzer.modules.cache import ProcessedCache
+from imap_error_mail_analyzer.modules.config import AccountConfig
+from imap_error_mail_analyzer.modules.pipeline import FolderScan
+from imap_error_mail_analyzer.utils.email_utils import message_from_raw
+
+_BOUNCE = b"""From: MAILER-DAEMON@mx.example.com
+To: sender@example.com
+Subject: Undelivered Mail
+Message-ID: <bounce%d@mx>
+Date: Mon, 10 Feb 2026 12:34:56 +0900
+MIME-Version: 1.0
+Content-Type: multipart/report; report-type=delivery-status; boundary="b1"
+
+--b1
+Content-Type: text/plain
+
+Delivery failed for user@example.org.
+
+--b1
+Content-Type: message/delivery-status
+
+Reporting-MTA: dns; mx.example.com
+
+Final-Recipient: rfc822; user@example.org
+Action: failed
+Status: 5.1.1
+Diagnostic-Code: smtp; 550 5.1.1 <user@example.org>: Recipient address rejected: User unknown
+
+--b1--
+""".replace(
+    b"\n", b"\r\n"
+)
+
+
+def _scan(tmp_path, archive=None, cache=None, folder="INBOX"):
+    account = AccountConfig(name="acc", host="localhost", port=143, username="sender@example.com", password="")
+    return FolderScan(folder, account, cache or ProcessedCache(tmp_path / "cache", "acc"), archive)
+
+
+def test_parse_archives_raw_bytes(tmp_path):
+    archive = RawArchive(tmp_path / "archive")
+    raw = _BOUNCE % 1
+    msg_hash, bounces = _scan(tmp_path, archive).parse(message_from_raw(raw))
+
+    assert bounces
+    assert archive.load(msg_hash) == raw
+
+
+def test_parse_skips_archive_for_partial_fetch(tmp_path):
+    archive = RawArchive(tmp_path / "archive")
+    msg_hash, bounces = _scan(tmp_path, archive).parse(message_from_raw(_BOUNCE % 2, partial=True))
+
+    assert bounces
+    assert archive.load(msg_hash) is None
+    assert not list(archive.iter_index())
+
+
+def test_message_in_two_folders_is_parsed_once(tmp_path):
+    cache = ProcessedCache(tmp_path / "cache", "acc")
+    inbox = _scan(tmp_path, cache=cache)
+    label = _scan(tmp_path, cache=cache, folder="[Gmail]/Label")
+
+    msg_hash, bounces = inbox.parse(message_from_raw(_BOUNCE % 3))
+    assert bounces
+    # Still being classified by the INBOX scan
+    assert label.parse(message_from_raw(_BOUNCE % 3)) == (msg_hash, [])
+
+    inbox.complete(msg_hash)
+    inbox.release()
+    assert cache.is_processed(msg_hash)
+    assert label.parse(message_from_raw(_BOUNCE % 3)) == (msg_hash, [])
+
+
+def test_release_frees_claims_of_failed_scan(tmp_path):
+    cache = ProcessedCache(tmp_path / "cache", "acc")
+    failed = _scan(tmp_path, cache=cache)
+    msg_hash, bounces = failed.parse(message_from_raw(_BOUNCE % 4))
+    assert bounces
+
+    failed.release()
+
+    assert not cache.is_processed(msg_hash)
+    assert _scan(tmp_path, cache=cache).parse(message_from_raw(_BOUNCE % 4))[1]
+
+
+def test_claim_is_exclusive_until_released(tmp_path):
+    cache = ProcessedCache(tmp_path / "cache", "acc")
+
+    assert cache.claim("abc") is True
+    assert cache.claim("abc") is False
+    cache.release("abc")
+    assert cache.claim("abc") is True
+    cache.mark_processed("abc")
+    assert cache.claim("abc") is False
@@ -0,0 +1,42 @@
+"""Tests for reading and rewriting report files."""
+
+import json
+
+from imap_error_mail_analyzer.modules.cli import _reclassify_account
+from imap_error_mail_analyzer.modules.report import read_reports
+
+_RECORD = {"error_code": "550", "error_message": "User unknown", "ai_responsible_party": "user_unknown", "to_addr": "user@example.org"}
+
+
+def _write_reports(tmp_path, target_text):
+    target_path = tmp_path / "20260210_acc_target.json"
+    excluded_path = tmp_path / "20260210_acc_excluded.json"
+    target_path.write_text(target_text, encoding="utf-8")
+    excluded_path.write_text(json.dumps([_RECORD]), encoding="utf-8")
+    return target_path, excluded_path
+
+
+def test_read_reports_returns_records(tmp_path):
+    _write_reports(tmp_path, json.dumps([_RECORD, _RECORD]))
+
+    target_records, excluded_records = read_reports(tmp_path, "20260210", "acc")
+
+    assert len(target_records) == 2
+    assert excluded_records == [_RECORD]
+
+
+def test_read_reports_rejects_truncated_file(tmp_path):
+    _write_reports(tmp_path, json.dumps([_RECORD, _RECORD])[:-20])
+
+    assert read_reports(tmp_path, "20260210", "acc") is None
+
+
+def test_reclassify_leaves_unreadable_reports_untouched(tmp_path):
+    truncated = json.dumps([_RECORD])[:-5]
+    target_path, excluded_path = _write_reports(tmp_path, truncated)
+    excluded_text = excluded_path.read_text(encoding="utf-8")
+
+    # The classifier must not be used when the reports cannot be loaded
+    assert _reclassify_account(tmp_path, "20260210", "acc", None) == (0, 0)
+    assert target_path.read_text(encoding="utf-8") == truncated
+    assert excluded_path.read_text(encoding="utf-8") == excluded_text
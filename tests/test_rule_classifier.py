@@ -0,0 +1,79 @@
+"""Tests for the rule-based pre-classification of bounces."""
+
+import pytest
+
+from imap_error_mail_analyzer.modules.bounce_parser import BounceRecord
+from imap_error_mail_analyzer.modules.rule_classifier import RuleClassifier
+
+
+def _bounce(message, error_code="550", delivery_status=None):
+    return BounceRecord(
+        date="2026-02-10T12:34:56+09:00",
+        error_code=error_code,
+        error_message=message,
+        from_addr="sender@example.com",
+        to_addr="user@example.org",
+        subject="Undelivered Mail",
+        body_plain="",
+        body_html="",
+        body_plain_original="",
+        body_html_original="",
+        delivery_status=delivery_status or {},
+        folder="INBOX",
+    )
+
+
+@pytest.mark.parametrize(
+    ("error_code", "message", "expected"),
+    [
+        ("554", "554 5.7.1 Service unavailable; Client host [192.0.2.1] blocked using zen.spamhaus.org", "ip_block"),
+        ("554", "554 Rejected: listed at bl.spamcop.net", "ip_block"),
+        ("452", "452 4.2.2 The recipient is receiving mail at a rate that prevents additional messages from being delivered", "user_rate_limit"),
+        ("550", "550 5.7.26 Unauthenticated email from example.com is not accepted due to its DMARC policy", "config_error"),
+        ("554", "554 5.7.1 <user@example.org>: Relay access denied", "config_error"),
+        ("552", "552 5.2.2 Mailbox full", "user_mailbox_full"),
+        ("550", "550 5.1.1 <user@example.org>: Recipient address rejected: User unknown", "user_unknown"),
+        ("550", "550 5.1.2 <user@example.org>: Host or domain name not found", "user_unknown"),
+    ],
+)
+def test_unambiguous_bounces_are_classified(error_code, message, expected):
+    result = RuleClassifier().classify(_bounce(message, error_code))
+
+    assert result["responsible"] == expected
+    assert result["classified_by"] == "rule"
+    assert result["is_excluded"] is expected.startswith("user_")
+    assert result["reason"]
+
+
+@pytest.mark.parametrize(
+    ("error_code", "message"),
+    [
+        ("550", "550 5.7.1 Message rejected as spam"),
+        ("421", "421 4.7.0 Try again later, closing connection"),
+        ("550", "550 5.1.2 Bad destination system address"),
+        ("", "Delivery failed for unknown reasons"),
+    ],
+)
+def test_ambiguous_bounces_are_left_to_the_llm(error_code, message):
+    assert RuleClassifier().classify(_bounce(message, error_code)) is None
+
+
+def test_delivery_status_code_wins_over_message_text():
+    bounce = _bounce("550 5.1.1 User unknown", delivery_status={"status": "5.2.2"})
+
+    assert RuleClassifier().classify(bounce)["responsible"] == "user_mailbox_full"
+
+
+def test_diagnostic_code_is_searched():
+    bounce = _bounce("Delivery failed", error_code="", delivery_status={"diagnostic_code": "smtp; 554 blocked using sbl.spamhaus.org"})
+
+    assert RuleClassifier().classify(bounce)["responsible"] == "ip_block"
+
+
+def test_rules_are_tried_in_order():
+    rules = (
+        {"category": "server_error", "patterns": (r"mailbox",), "reason": "first"},
+        {"category": "user_mailbox_full", "status": ("5.2.2",), "reason": "second"},
+    )
+
+    assert RuleClassifier(rules).classify(_bounce("552 5.2.2 Mailbox full"))["reason"] == "first"